@@ -0,0 +1,348 @@
+"""Offline load test for the `/post` pipeline
+
+Runs the real `Post_Command` against a fake `discord.Interaction`, a local stand-in for the reddit api and a local image server.
+No discord or reddit credentials are required, nothing leaves the machine.
+
+Example:
+    python benchmarks/post_pipeline.py --commands 40 --concurrency 8 --images 10 --width 3000 --height 2000
+    python benchmarks/post_pipeline.py --same-post --cache-mb 256 --spill-mb 4 --images 20
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from time import perf_counter
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+from aiohttp import web
+from PIL import Image
+
+base_path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(base_path / "src"))
+
+from cogs.post import Post_Command
+from pipeline.downloader import Media_Downloader
+from pipeline.media_buffer import Memory_Budget
+from pipeline.scheduler import Job_Scheduler
+from pipeline.transcode_cache import Transcode_Cache
+from pipeline.transcoder import Transcode_Engine
+from platforms.reddit import Reddit_Adapter
+from platforms.registry import Platform_Registry
+from utils.adv_configparser import Advanced_ConfigParser
+from utils.config_service import Config_Service
+
+def percentile(values:list[float], percent:float) -> float:
+    """Returns the percentile (0 - 100) of the values, using the nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))]
+
+def get_peak_descendant_rss() -> float:
+    """Returns the largest peak RSS (in MB) of the running descendants of this process
+
+    The transcoding workers are forked by the forkserver, they are never accounted as children of this process"""
+    parents:dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    parents[int(entry)] = int(stat.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+
+    descendants = {os.getpid()}
+    while True:
+        found = {pid for pid, parent in parents.items() if parent in descendants} - descendants
+        if not found:
+            break
+        descendants |= found
+    peak_rss = 0
+    for pid in descendants - {os.getpid()}:
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                peak_rss = max([peak_rss] + [int(line.split()[1]) for line in status if line.startswith("VmHWM:")])
+        except OSError:
+            continue
+    return peak_rss / 1024
+
+def generate_image(width:int, height:int, image_format:str) -> bytes:
+    """Generates an image with a mix of smooth areas and noise, to get realistic encoding costs"""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 64)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    buffer = BytesIO()
+    image.save(buffer, format = image_format)
+    return buffer.getvalue()
+
+class Fake_Servers:
+    """Serves the reddit api (token and submission endpoints) and the images of the galleries on localhost"""
+
+    def __init__(self, arguments:argparse.Namespace):
+        self.__arguments = arguments
+        self.__extension = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}[arguments.format]
+        self.__image = generate_image(arguments.width, arguments.height, arguments.format)
+        self.__runner:web.AppRunner | None = None
+        self.base_url = ""
+        self.info_requests = 0
+        self.api_requests = 0
+
+    async def __access_token(self, request:web.Request) -> web.Response:
+        return web.json_response({"access_token": "benchmark", "token_type": "bearer", "expires_in": 86400, "scope": "*"})
+
+    def __make_submission(self, submission_id:str) -> dict:
+        media_metadata = {
+            f"{submission_id}m{index}": {"status": "valid", "e": "Image", "m": f"image/{self.__extension}", "id": f"{submission_id}m{index}"}
+            for index in range(self.__arguments.images)
+        }
+        return {
+            "id": submission_id,
+            "name": f"t3_{submission_id}",
+            "title": f"Benchmark post {submission_id}",
+            "author": "benchmark",
+            "subreddit": "benchmark",
+            "url": f"{self.base_url}/gallery/{submission_id}",
+            "permalink": f"/r/benchmark/comments/{submission_id}/",
+            "is_gallery": True,
+            "media_metadata": media_metadata
+        }
+
+    def __rate_limit_headers(self) -> dict[str, str]:
+        """Reports a rate limit window of 600 requests, like reddit does for oauth clients"""
+        self.api_requests += 1
+        return {"x-ratelimit-remaining": str(max(0, 600 - self.api_requests)), "x-ratelimit-used": str(self.api_requests), "x-ratelimit-reset": "600"}
+
+    async def __submission(self, request:web.Request) -> web.Response:
+        await asyncio.sleep(self.__arguments.reddit_latency / 1000)
+        submission = self.__make_submission(request.match_info["submission_id"])
+        return web.json_response([
+            {"kind": "Listing", "data": {"children": [{"kind": "t3", "data": submission}], "after": None, "before": None}},
+            {"kind": "Listing", "data": {"children": [], "after": None, "before": None}}
+        ], headers = self.__rate_limit_headers())
+
+    async def __info(self, request:web.Request) -> web.Response:
+        await asyncio.sleep(self.__arguments.reddit_latency / 1000)
+        self.info_requests += 1
+        children = [{"kind": "t3", "data": self.__make_submission(fullname.removeprefix("t3_"))} for fullname in request.query["id"].split(",")]
+        return web.json_response({"kind": "Listing", "data": {"children": children, "after": None, "before": None}}, headers = self.__rate_limit_headers())
+
+    async def __media(self, request:web.Request) -> web.Response:
+        await asyncio.sleep(self.__arguments.image_latency / 1000)
+        return web.Response(body = self.__image, content_type = f"image/{self.__extension}")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/api/v1/access_token", self.__access_token)
+        app.router.add_get("/comments/{submission_id}/", self.__submission)
+        app.router.add_get("/api/info/", self.__info)
+        app.router.add_get("/media/{name}", self.__media)
+        self.__runner = web.AppRunner(app, access_log = None)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.__runner.cleanup()
+
+class Fake_Response:
+    def __init__(self):
+        self.__done = False
+
+    def is_done(self) -> bool:
+        return self.__done
+
+    async def defer(self, **kwargs):
+        self.__done = True
+
+    async def send_message(self, *args, **kwargs):
+        self.__done = True
+
+class Fake_Followup:
+    def __init__(self, upload_latency:float):
+        self.__upload_latency = upload_latency
+        self.uploaded_files = 0
+        self.sent_messages = 0
+        self.failed = False
+
+    async def send(self, content:str = None, *, files:list[discord.File] = None, embed:discord.Embed = None, **kwargs):
+        if embed is not None:
+            self.failed = True
+        for file in files or ():
+            # Consume the files like the multipart upload would
+            file.fp.read()
+            file.close()
+            self.uploaded_files += 1
+        await asyncio.sleep(self.__upload_latency / 1000)
+        self.sent_messages += 1
+        return SimpleNamespace(id = 0)
+
+class Fake_Interaction:
+    """Provides the parts of `discord.Interaction` the post command makes use of"""
+    id_counter = itertools.count()
+
+    def __init__(self, client:SimpleNamespace, upload_latency:float):
+        self.id = next(self.id_counter)
+        self.client = client
+        self.user = SimpleNamespace(id = self.id, name = f"benchmark_user_{self.id}")
+        self.guild = SimpleNamespace(id = self.id % 8, filesize_limit = discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES)
+        self.channel = None
+        self.command = None
+        self.response = Fake_Response()
+        self.followup = Fake_Followup(upload_latency)
+        self.edits = 0
+
+    async def edit_original_response(self, **kwargs):
+        self.edits += 1
+
+    async def delete_original_response(self):
+        pass
+
+class Loop_Lag_Sampler:
+    """Measures how late the event loop wakes up a sleeping task"""
+
+    def __init__(self, interval:float = 0.01):
+        self.__interval = interval
+        self.samples:list[float] = []
+        self.__task:asyncio.Task | None = None
+
+    async def __sample(self):
+        while True:
+            start = perf_counter()
+            await asyncio.sleep(self.__interval)
+            self.samples.append(max(0.0, perf_counter() - start - self.__interval))
+
+    def start(self):
+        self.__task = asyncio.create_task(self.__sample())
+
+    def stop(self):
+        self.__task.cancel()
+
+async def run_benchmark(arguments:argparse.Namespace):
+    # The config is created from the template in a temporary directory, the config of the bot is left untouched
+    config_directory = tempfile.TemporaryDirectory()
+    shutil.copy(base_path / "config" / ".bot.template", Path(config_directory.name) / ".bot.template")
+    bot_config = Advanced_ConfigParser(Path(config_directory.name) / "bot.ini")
+    servers = Fake_Servers(arguments)
+    await servers.start()
+
+    cache_directory = tempfile.TemporaryDirectory()
+    http_session = aiohttp.ClientSession(connector = aiohttp.TCPConnector(
+        limit = bot_config.getint("NETWORK", "CONNECTION_LIMIT"),
+        limit_per_host = bot_config.getint("NETWORK", "CONNECTION_LIMIT_PER_HOST")
+    ))
+    platform_registry = Platform_Registry()
+    platform_registry.register(Reddit_Adapter.PLATFORM_NAME, Reddit_Adapter.HOSTNAMES, lambda: Reddit_Adapter(
+        "benchmark", "benchmark",
+        media_base_url = f"{servers.base_url}/media",
+        oauth_url = servers.base_url,
+        reddit_url = servers.base_url,
+        check_for_updates = False
+    ), exact_hostnames = Reddit_Adapter.EXACT_HOSTNAMES)
+    client = SimpleNamespace(
+        components_ready = True,
+        bot_config = bot_config,
+        config = Config_Service(bot_config),
+        http_session = http_session,
+        platform_registry = platform_registry,
+        media_downloader = Media_Downloader(http_session, bot_config.getint("NETWORK", "MAX_CONCURRENT_DOWNLOADS"), bot_config.getint("NETWORK", "MAX_DOWNLOAD_SIZE_MB") * 1024 * 1024),
+        transcode_engine = Transcode_Engine(
+            arguments.workers,
+            bot_config.getfloat("TRANSCODING", "JOB_TIMEOUT"),
+            bot_config.getint("TRANSCODING", "MIN_QUALITY"),
+            bot_config.getint("TRANSCODING", "MAX_FIT_ATTEMPTS"),
+            bot_config.getint("TRANSCODING", "MAX_EDGE"),
+            bot_config.getint("TRANSCODING", "MAX_IMAGE_PIXELS")
+        ),
+        # Disabled unless requested, every command would be answered from the cache otherwise
+        transcode_cache = Transcode_Cache(cache_directory.name, arguments.cache_mb * 1024 * 1024),
+        # The fake followup does not return attachments, which could be linked
+        attachment_index = None,
+        memory_budget = Memory_Budget((arguments.spill_mb if arguments.spill_mb is not None else bot_config.getint("MEMORY", "SPILL_THRESHOLD_MB")) * 1024 * 1024),
+        job_scheduler = Job_Scheduler(arguments.max_jobs or bot_config.getint("SCHEDULER", "MAX_CONCURRENT_JOBS"), bot_config.getint("SCHEDULER", "MAX_QUEUE_LENGTH"))
+    )
+    cog = Post_Command(client)
+
+    latencies:list[float] = []
+    failures = 0
+    uploaded_files = 0
+    sent_messages = 0
+    edits = 0
+    semaphore = asyncio.Semaphore(arguments.concurrency)
+
+    async def run_command(number:int):
+        nonlocal failures, uploaded_files, sent_messages, edits
+        submission_ids = ["bench0"] if arguments.same_post else [f"bench{number}x{post}" for post in range(arguments.posts_per_command)]
+        post_urls = [f"https://www.reddit.com/r/benchmark/comments/{submission_id}/post/" for submission_id in submission_ids]
+        interaction = Fake_Interaction(client, arguments.upload_latency)
+        async with semaphore:
+            start = perf_counter()
+            if len(post_urls) == 1:
+                await cog.post.callback(cog, interaction, url = post_urls[0], quality = arguments.quality)
+            else:
+                await cog.post_many.callback(cog, interaction, urls = " ".join(post_urls), quality = arguments.quality)
+            latencies.append(perf_counter() - start)
+        failures += interaction.followup.failed
+        uploaded_files += interaction.followup.uploaded_files
+        sent_messages += interaction.followup.sent_messages
+        edits += interaction.edits
+
+    sampler = Loop_Lag_Sampler()
+    sampler.start()
+    begin = perf_counter()
+    await asyncio.gather(*(run_command(number) for number in range(arguments.commands)))
+    elapsed = perf_counter() - begin
+    sampler.stop()
+    peak_worker_rss = get_peak_descendant_rss()
+
+    await platform_registry.close()
+    await http_session.close()
+    client.transcode_engine.shutdown()
+    await servers.stop()
+    cache_directory.cleanup()
+    config_directory.cleanup()
+
+    # ru_maxrss is reported in kilobytes on linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Commands:            {arguments.commands} ({failures} failed), concurrency {arguments.concurrency}")
+    print(f"Images:              {uploaded_files} uploaded in {sent_messages} messages, {edits} progress edits, {servers.info_requests} batched reddit requests")
+    print(f"Throughput:          {arguments.commands / elapsed:.2f} commands/sec ({elapsed:.2f}s total)")
+    print(f"Latency:             p50 {percentile(latencies, 50) * 1000:.0f}ms, p95 {percentile(latencies, 95) * 1000:.0f}ms, p99 {percentile(latencies, 99) * 1000:.0f}ms, mean {statistics.fmean(latencies) * 1000:.0f}ms")
+    print(f"Event loop lag:      p50 {percentile(sampler.samples, 50) * 1000:.1f}ms, p99 {percentile(sampler.samples, 99) * 1000:.1f}ms, max {max(sampler.samples, default = 0) * 1000:.1f}ms")
+    print(f"Peak RSS:            {peak_rss:.0f}MB (largest worker {peak_worker_rss:.0f}MB)")
+    print(f"Media in flight:     peak {client.memory_budget.get_peak_bytes_in_flight() / 1048576:.1f}MB, {client.memory_budget.get_spilled_images()} images ({client.memory_budget.get_spilled_bytes() / 1048576:.1f}MB) spilled to disk")
+    print(f"Transcode cache:     {client.transcode_cache.get_hits()} hits, {client.transcode_cache.get_misses()} misses")
+    return failures
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description = "Offline load test for the /post pipeline")
+    parser.add_argument("--commands", type = int, default = 20, help = "Number of commands to execute")
+    parser.add_argument("--concurrency", type = int, default = 4, help = "Number of commands running at the same time")
+    parser.add_argument("--posts-per-command", type = int, default = 1, help = "Number of posts per command, more than one uses /post_many")
+    parser.add_argument("--images", type = int, default = 5, help = "Number of images per gallery")
+    parser.add_argument("--width", type = int, default = 2000, help = "Width of the served images")
+    parser.add_argument("--height", type = int, default = 1500, help = "Height of the served images")
+    parser.add_argument("--format", choices = ("JPEG", "PNG", "WEBP"), default = "JPEG", help = "Format of the served images")
+    parser.add_argument("--quality", type = int, default = 95, help = "Quality passed to the command")
+    parser.add_argument("--workers", type = int, default = 2, help = "Number of transcoding worker processes")
+    parser.add_argument("--image-latency", type = float, default = 50, help = "Latency (ms) of the image server")
+    parser.add_argument("--reddit-latency", type = float, default = 150, help = "Latency (ms) of the reddit api")
+    parser.add_argument("--upload-latency", type = float, default = 300, help = "Latency (ms) of the upload to discord")
+    parser.add_argument("--same-post", action = "store_true", help = "Post the same submission with every command")
+    parser.add_argument("--max-jobs", type = int, default = 0, help = "Number of commands admitted by the job scheduler at once, taken from the template by default")
+    parser.add_argument("--spill-mb", type = int, default = None, help = "Bytes of media held in memory before images are spilled to disk, taken from the template by default")
+    parser.add_argument("--cache-mb", type = int, default = 0, help = "Size of the transcode cache, disabled by default")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(run_benchmark(parse_arguments())) else 0)
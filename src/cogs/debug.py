@@ -3,14 +3,20 @@ from discord import app_commands
 from discord.ext import commands
 from cogs.base_cog import Base_Cog
 
+import asyncio
 import logging
+import threading
+from collections import Counter
 from datetime import datetime
 from utils.datetime_tools import get_elapsed_time_big
+from utils.truncate_str import truncate_message_with_notice
 from utils.logger.decorator import log_command_execution
+from utils.profiler import Allocation_Tracer, Sampling_Profiler, save_report
 
 class Debug_Command(Base_Cog):
     def __init__(self, bot:commands.Bot):
         self.__bot = bot
+        self.__profiling = False
         super().__init__(logging.getLogger("cmds.debug"))
 
     @app_commands.command(name = "debug", description = "Provides debug informations about the bot, useful for troubleshooting")
@@ -25,7 +31,7 @@ class Debug_Command(Base_Cog):
                         value=f"{get_elapsed_time_big(datetime.now().timestamp() - ctx.client.STARTUP_TIMESTAMP)}",
                         inline=True)
         embed.add_field(name="Bot Owner",
-                        value=f"<@{ctx.client.bot_config['DISCORD']['OWNER_ID']}>",
+                        value=f"<@{ctx.client.config.get_str('DISCORD', 'OWNER_ID')}>",
                         inline=True)
         embed.add_field(name="Latency to Gateway",
                         value=f"{round(self.__bot.latency * 1000, 2)}ms",
@@ -36,10 +42,93 @@ class Debug_Command(Base_Cog):
         embed.add_field(name="Number of Guilds",
                         value=f"{len(self.__bot.guilds)}",
                         inline=True)
+        guilds_per_shard = Counter(guild.shard_id for guild in self.__bot.guilds)
+        shard_lines = [f"#{shard_id}: {round(latency * 1000, 2)}ms, {guilds_per_shard[shard_id]} guilds" for shard_id, latency in self.__bot.latencies]
+        embed.add_field(name=f"Shards (worker {self.__bot.WORKER_INDEX}, {len(shard_lines)} of {self.__bot.shard_count})",
+                        value=truncate_message_with_notice("\n".join(shard_lines), 1000, "..."),
+                        inline=False)
         embed.add_field(name = "Number of executed commands", value=f"Total: {ctx.client.no_executed_commands}\nSucceeded: {ctx.client.no_succeeded_commands}\nFailed: {ctx.client.no_failed_commands}")
+        for platform in ctx.client.platform_registry.get_platforms():
+            stats = platform.stats
+            if not platform.is_constructed():
+                embed.add_field(name = f"Platform {platform.name}", value = "Not used yet")
+                continue
+            value = f"Health: {'healthy' if stats.is_healthy() else 'failing'}\nFetches: {stats.total_fetches} ({stats.failed_fetches} failed)\nLatency: {round(stats.get_average_latency() * 1000)}ms avg, {round(stats.get_max_latency() * 1000)}ms max"
+            if hasattr(platform.adapter, "get_events_last_5m_10m_15m"):
+                value += f"\nRequests (5m / 10m / 15m): {' / '.join(map(str, platform.adapter.get_events_last_5m_10m_15m()))}\nCache hits (5m / 10m / 15m): {' / '.join(map(str, platform.adapter.get_cache_hits_last_5m_10m_15m()))}"
+            if hasattr(platform.adapter, "get_rate_limit"):
+                rate_limit = platform.adapter.get_rate_limit()
+                remaining = rate_limit.get_remaining()
+                value += f"\nRate limit: {'unknown' if remaining is None else f'{remaining:.0f} left, {rate_limit.get_used()} used, resets in {rate_limit.get_seconds_until_reset():.0f}s'}"
+            embed.add_field(name = f"Platform {platform.name}", value = value)
+        transcode_engine = ctx.client.transcode_engine
+        if transcode_engine is not None:
+            embed.add_field(name = "Transcoding", value=f"Workers: {transcode_engine.get_worker_count()}\nPending jobs: {transcode_engine.get_pending_jobs()}\nQueue depth: {transcode_engine.get_queue_depth()}\nTotal jobs: {transcode_engine.get_total_jobs()}\nTimed out: {transcode_engine.get_timed_out_jobs()}")
+        job_scheduler = ctx.client.job_scheduler
+        if job_scheduler is not None:
+            embed.add_field(name = "Job scheduler", value=f"Running: {job_scheduler.get_running_jobs()} of {job_scheduler.get_max_concurrent_jobs()}\nQueued: {job_scheduler.get_queued_jobs()}\nRejected: {job_scheduler.get_rejected_jobs()}")
+        memory_budget = ctx.client.memory_budget
+        if memory_budget is not None:
+            embed.add_field(name = "Media memory", value=f"In flight: {memory_budget.get_bytes_in_flight() / 1048576:.1f}MB\nPeak: {memory_budget.get_peak_bytes_in_flight() / 1048576:.1f}MB\nSpilled: {memory_budget.get_spilled_images()} images ({memory_budget.get_spilled_bytes() / 1048576:.1f}MB)")
+        transcode_cache = ctx.client.transcode_cache
+        if transcode_cache is not None:
+            embed.add_field(name = "Transcode cache", value=f"Hits: {transcode_cache.get_hits()}\nMisses: {transcode_cache.get_misses()}\nEntries: {transcode_cache.get_entry_count()}\nSize: {transcode_cache.get_size() / 1048576:.1f} of {transcode_cache.get_max_size() / 1048576:.0f}MB")
+
+        loop_monitor = ctx.client.loop_monitor
+        if loop_monitor is not None:
+            embed.add_field(name = "Event loop", value=f"Lag: {loop_monitor.get_lag_percentile(50) * 1000:.1f}ms p50, {loop_monitor.get_lag_percentile(99) * 1000:.1f}ms p99, {loop_monitor.get_max_lag() * 1000:.0f}ms max\nBlocked: {loop_monitor.get_blocked_calls()} times\nTasks: {loop_monitor.get_task_count()}")
+            embed.add_field(name = "Process", value=f"RSS: {loop_monitor.get_rss() / 1048576:.1f}MB\nCPU time: {loop_monitor.get_cpu_time():.1f}s\nThreads: {threading.active_count()}")
 
         await ctx.response.send_message(embed=embed)
 
+    def __is_owner(self, ctx:discord.Interaction) -> bool:
+        """Returns True, if the user of the interaction is the owner configured in the bot config"""
+        return str(ctx.user.id) == ctx.client.config.get_str("DISCORD", "OWNER_ID").strip()
+
+    @app_commands.command(name = "sync", description = "Syncs the commands of the bot with discord (owner only)")
+    @log_command_execution
+    async def sync(self, ctx:discord.Interaction):
+        if not self.__is_owner(ctx):
+            await ctx.response.send_message("Only the owner of the bot may use this command", ephemeral = True)
+            return
+
+        await ctx.response.defer(ephemeral = True, thinking = True)
+        await ctx.client.sync_command_tree(force = True)
+        await ctx.followup.send(f"Synced {len(ctx.client.tree.get_commands())} commands with discord", ephemeral = True)
+
+    @app_commands.command(name = "profile", description = "Profiles the running bot for a while and sends the report (owner only)")
+    @app_commands.describe(kind = "What to profile", duration = "Number of seconds to profile for", top = "Number of functions or allocation sites in the report")
+    @app_commands.choices(kind = [
+        app_commands.Choice(name = "CPU (sampling of all threads)", value = Sampling_Profiler.KIND),
+        app_commands.Choice(name = "Memory (allocations traced with tracemalloc)", value = Allocation_Tracer.KIND)
+    ])
+    @log_command_execution
+    async def profile(self, ctx:discord.Interaction, kind:app_commands.Choice[str], duration:app_commands.Range[int, 1, 120] = 15, top:app_commands.Range[int, 5, 200] = 30):
+        if not self.__is_owner(ctx):
+            await ctx.response.send_message("Only the owner of the bot may use this command", ephemeral = True)
+            return
+        if self.__profiling:
+            await ctx.response.send_message("A profile is already being recorded, wait for it to finish", ephemeral = True)
+            return
+
+        self.__profiling = True
+        try:
+            await ctx.response.defer(ephemeral = True, thinking = True)
+            profiler = Sampling_Profiler() if kind.value == Sampling_Profiler.KIND else Allocation_Tracer()
+            self._logger.info("Recording a %s profile for %ss, requested by %s (%s)", kind.value, duration, ctx.user.name, ctx.user.id)
+            await profiler.run(duration)
+
+            # Saved on disk as well, the report stays available after the message has been deleted
+            report = await asyncio.to_thread(profiler.format_report, top)
+            report_path = await asyncio.to_thread(save_report, ctx.client.profile_directory, f"{kind.value}_worker{ctx.client.WORKER_INDEX}", report)
+            if isinstance(profiler, Allocation_Tracer):
+                await asyncio.to_thread(profiler.save_snapshot, report_path.with_suffix(".tracemalloc"))
+            self._logger.info("Saved the %s profile to '%s'", kind.value, report_path)
+            await ctx.followup.send(f"Recorded a {kind.value} profile for `{duration}`s, saved to `{report_path.name}`", file = discord.File(report_path), ephemeral = True)
+        finally:
+            self.__profiling = False
+
+
 
 async def setup(bot:commands.Bot):
     await bot.add_cog(Debug_Command(bot))
\ No newline at end of file
@@ -3,18 +3,42 @@ from discord import app_commands
 from discord.ext import commands
 from cogs.base_cog import Base_Cog
 
+import asyncio
 import logging
+import re
+from typing import Callable
 from urllib.parse import urlparse
 from asyncpraw.models import Submission
-import aiohttp
-from PIL import Image
-from io import BytesIO
 from datetime import datetime
 from utils.datetime_tools import get_elapsed_time_milliseconds
+from utils.progress_reporter import Progress_Reporter
+from utils.metrics import MEDIA_BYTES_OUT, POST_STAGE_SECONDS
+from pipeline.scheduler import Job_Ticket, SchedulerBusy
+from pipeline.media_buffer import Command_Buffers, Media_Buffer
+from platforms.registry import Platform_Entry
+from utils.truncate_str import truncate_message_with_notice
 
 class NoMediaFound(Exception): 
     pass
 
+class StartingUp(Exception):
+    pass
+
+QUALITY_CHOICES = [
+    app_commands.Choice(name = "Poor (60)", value = 60),
+    app_commands.Choice(name = "Fair (70)", value = 70),
+    app_commands.Choice(name = "Good (80)", value = 80),
+    app_commands.Choice(name = "Very Good (85)", value = 85),
+    app_commands.Choice(name = "Excellent (90)", value = 90),
+    app_commands.Choice(name = "Superior (95)", value = 95),
+    app_commands.Choice(name = "Perfect (100)", value = 100)
+]
+URL_SEPARATOR = re.compile(r"[\s,]+")
+# Maximum number of attachments (and embeds) discord allows per message, larger galleries are sent as a series of messages
+MAX_ATTACHMENTS = 10
+# Maximum number of embeds sharing an url, discord merges into a single gallery
+MAX_LINKED_IMAGES = 4
+
 class Post_Command(Base_Cog):
     def __init__(self, bot:commands.Bot):
         self.__bot = bot
@@ -22,102 +46,84 @@ class Post_Command(Base_Cog):
 
     @app_commands.command(name = "post", description = "Post an embed in the Current Channel with a link to the content")
     @app_commands.describe(url = "URL to the post", custom_note = "Describe the post with your own note", use_title = "Display the title of the post", quality = "Specifies the quality of the converted image, closer to 100 is better")
-    @app_commands.choices(quality = [
-        app_commands.Choice(name = "Poor (60)", value = 60),
-        app_commands.Choice(name = "Fair (70)", value = 70),
-        app_commands.Choice(name = "Good (80)", value = 80),
-        app_commands.Choice(name = "Very Good (85)", value = 85),
-        app_commands.Choice(name = "Excellent (90)", value = 90),
-        app_commands.Choice(name = "Superior (95)", value = 95),
-        app_commands.Choice(name = "Perfect (100)", value = 100)
-    ])
-    async def post(self, ctx:discord.Interaction, url:str, custom_note:str = None, use_title:bool = True, quality:app_commands.Choice[int] = 95):
+    @app_commands.choices(quality = QUALITY_CHOICES)
+    async def post(self, ctx:discord.Interaction, url:str, custom_note:str = None, use_title:bool = True, quality:app_commands.Choice[int] = None):
+        progress:Progress_Reporter = None
+        ticket:Job_Ticket = None
+        buffers:Command_Buffers = None
         try:
-            domain_info = urlparse(url)
-            toplevel_domain = '.'.join(domain_info.netloc.split('.')[-2:])
+            progress = Progress_Reporter(ctx, ctx.client.config.get_float("POST", "PROGRESS_INTERVAL"))
+            # The components of the bot are created by the startup routine, after the bot already receives commands
+            if not ctx.client.components_ready:
+                raise StartingUp
+            buffers = ctx.client.memory_budget.track()
+            platform = ctx.client.platform_registry.resolve(url)
             begin_process = datetime.now().timestamp()
-            match toplevel_domain:
-                case "reddit.com":
-                    self._logger.debug(f"Recieved command by {ctx.user} ({ctx.user.id}) for reddit ({url})")
-                    subm:Submission = await ctx.client.reddit_adapter.fetch(url)
-                    image_urls = []
-                    # Check if submission has a gallery
-                    if hasattr(subm, "media_metadata"):
-                        for media_id, media in subm.media_metadata.items():
-                            file_extension = media["m"].split("/")[1]
-                            if file_extension not in ("jpg", "jpeg", "png", "webp", "heic", "heif"):
-                                continue
-                            image_urls.append(f"https://i.redd.it/{media_id}.{file_extension}")
-                    else:
-                        image_urls.append(subm.url)
-                    image_count = len(image_urls)
-                    if image_count == 0:
-                        raise NoMediaFound
-                    self._logger.debug(f"Found {image_count} image urls for the post")
-
-                    progress_title = f"`{image_count}` images are going to be converted, it may take a while."
-                    progress_temp = progress_title + f"\n`0` of `{image_count}` have already been loaded"
-                    await ctx.response.send_message(progress_temp, ephemeral = True)
-
-                    if isinstance(quality, app_commands.Choice):
-                        quality_value = quality.value
-                    else:
-                        quality_value = quality
-
-                    # Download and convert each image
-                    image_files:list[discord.File] = []
-                    begin_conversion = datetime.now().timestamp()
-                    async with aiohttp.ClientSession() as session:
-                        index = 0
-                        for image_url in image_urls:
-                            async with session.get(image_url) as response:
-                                response.raise_for_status()
-                                image_data = await response.read()
-
-                            original_image = Image.open(BytesIO(image_data))
-                            webp_buffer = BytesIO()
-                            original_image.save(webp_buffer, format = "WEBP", quality = quality_value)
-                            webp_buffer.seek(0)
-                            image_file = discord.File(webp_buffer, filename = f"image_{index}.webp")
-                            image_files.append(image_file)
-                            index += 1
-
-                            progress_temp = progress_title + f"\n`{index}` of `{image_count}` have already been loaded"
-                            await ctx.edit_original_response(content = progress_temp)
-                        
-                    self._logger.debug(f"Downloaded and converted {len(image_files)} images in {get_elapsed_time_milliseconds(datetime.now().timestamp() - begin_conversion)}")
-                    
-                    author = subm.author.name if subm.author else "Author not found"
-                    content = f":copyright: [{author}]({url})"
-                    if use_title:
-                        content += f"\n# {subm.title}"
-
-                    if custom_note:
-                        content += f"\n> {custom_note}"
-                    
-                    await ctx.delete_original_response()
-                    message = await ctx.followup.send(
-                        content = content,
-                        suppress_embeds = True,
-                        files = image_files
-                    )
+            # No platform for the domain found
+            if platform is None:
+                hostname = urlparse(url).hostname or "not_found"
+                supported_platforms = "\n".join(f"- {entry.name}" for entry in ctx.client.platform_registry.get_platforms())
+                embed = discord.Embed(
+                    title = "Domain not found",
+                    description = f"The requested domain `{hostname}` is currently not supported\nOpen [an issue](https://github.com/official-Cromatin/Post-It/issues/new?assignees=&labels=feature-request&projects=&template=feature_request.yml) to request support for it.\n\nCurrently supported plattforms:\n{supported_platforms}",
+                    color = 0xED4337)
 
-                    self._logger.info(f"Successfully processed the command executed by {ctx.user.name} ({ctx.user.id}) after {get_elapsed_time_milliseconds(datetime.now().timestamp() - begin_process)} (ID of message: {message.id})")
-                
-                # No domain for seperation found
-                case _:
-                    if toplevel_domain == "":
-                        toplevel_domain = "not_found"
-                        
-                    embed = discord.Embed(
-                        title = "Domain not found",
-                        description = f"The requested domain `{toplevel_domain}` is currently not supported\nOpen [an issue](https://github.com/official-Cromatin/Post-It/issues/new?assignees=&labels=feature-request&projects=&template=feature_request.yml) to request support for it.\n\nCurrently supported plattforms:\n- Reddit",
-                        color = 0xED4337)
+                await ctx.response.send_message(embed = embed, ephemeral = True)
+                return
+
+            self._logger.debug("Recieved command by %s (%s) for %s (%s)", ctx.user, ctx.user.id, platform.name, url)
+            # Reject the command right away if the queue is full, instead of letting it wait for minutes
+            ticket = ctx.client.job_scheduler.submit(ctx.guild.id if ctx.guild is not None else None, ctx.user.id)
+            # Acknowledge before fetching, the fetch may take longer than the deadline of the interaction
+            await progress.defer()
+            with POST_STAGE_SECONDS.time(stage = "platform_fetch"):
+                subm:Submission = await platform.fetch(url)
+            image_urls = platform.adapter.get_image_urls(subm)
+            image_count = len(image_urls)
+            if image_count == 0:
+                raise NoMediaFound
+            self._logger.debug("Found %s image urls for the post", image_count)
+
+            # Link the attachments of an earlier upload, if the post has already been converted with the same quality
+            quality_value = self.__get_quality_value(ctx, quality)
+            attachment_urls = await self.__get_uploaded_image_urls(ctx, subm, image_urls, quality_value)
+            content = self.__build_content(subm, url, use_title, custom_note)
+            if attachment_urls is not None:
+                progress.cancel()
+                await ctx.delete_original_response()
+                messages = await self.__send_linked_post(ctx, content, url, attachment_urls)
+            else:
+                # Wait for a free slot, the downloads and conversions of the other commands are running in the meantime
+                def report_position(position:int):
+                    progress.update(f"`{image_count}` images are waiting to be converted.\nYour request is number `{position}` in the queue")
+                await ticket.acquire(report_position)
+
+                progress_title = f"`{image_count}` images are going to be converted, it may take a while."
+                progress.update(progress_title + f"\n`0` of `{image_count}` have already been loaded")
+
+                begin_conversion = datetime.now().timestamp()
+                webp_images = await self.__convert_images(ctx, buffers, image_urls, quality_value, lambda loaded_images: progress.update(progress_title + f"\n`{loaded_images}` of `{image_count}` have already been loaded"))
+                self._logger.debug("Downloaded and converted %s images in %s", len(webp_images), get_elapsed_time_milliseconds(datetime.now().timestamp() - begin_conversion))
+
+                progress.cancel()
+                await ctx.delete_original_response()
+                messages = await self.__send_post(ctx, buffers, subm, image_urls, quality_value, content, webp_images)
+            POST_STAGE_SECONDS.observe(datetime.now().timestamp() - begin_process, stage = "total")
 
-                    await ctx.response.send_message(embed = embed, ephemeral = True)
+            self._logger.info("Successfully processed the command executed by %s (%s) after %s (ID of messages: %s)", ctx.user.name, ctx.user.id, get_elapsed_time_milliseconds(datetime.now().timestamp() - begin_process), ", ".join(str(message.id) for message in messages))
+
+        except StartingUp:
+            self._logger.warning("Rejected command by %s (%s), the bot is still starting up", ctx.user.name, ctx.user.id)
+            await self.__send_starting_up(ctx)
+
+        except SchedulerBusy:
+            self._logger.warning("Rejected command by %s (%s), the job queue is full", ctx.user.name, ctx.user.id)
+            await self.__send_busy(ctx)
 
         except NoMediaFound:
-            self._logger.error(f"Aborted issued command by {ctx.user.name} ({ctx.user.id}). Post had no media attatched")
+            if progress is not None:
+                progress.cancel()
+            self._logger.error("Aborted issued command by %s (%s). Post had no media attatched", ctx.user.name, ctx.user.id)
 
             # Delete the original response, if existing
             try:
@@ -129,10 +135,16 @@ class Post_Command(Base_Cog):
                 description = "The post had no media attatched, or was in an unsupported format\nVideos are not supported! (yet)",
                 color = 0xED4337
             )
-            embed.set_footer(text = "Supported image formats: jpg, jpeg, png, webp, heic, heif")
+            embed.set_footer(text = "Supported image formats: jpg, jpeg, png, webp, heic, heif, gif")
+            if ctx.response.is_done():
+                await ctx.followup.send(embed = embed, ephemeral = True)
+            else:
+                await ctx.response.send_message(embed = embed, ephemeral = True)
 
         except discord.errors.HTTPException as error:
-            self._logger.error(f"Could not complete command by {ctx.user.name} ({ctx.user.id})")
+            if progress is not None:
+                progress.cancel()
+            self._logger.error("Could not complete command by %s (%s)", ctx.user.name, ctx.user.id)
             self._logger.exception(error, stack_info = True)
 
             match error.code:
@@ -151,7 +163,9 @@ class Post_Command(Base_Cog):
                         await ctx.response.send_message(embed = embed)
 
         except Exception as error:
-            self._logger.error(f"Could not complete command by {ctx.user.name} ({ctx.user.id})")
+            if progress is not None:
+                progress.cancel()
+            self._logger.error("Could not complete command by %s (%s)", ctx.user.name, ctx.user.id)
             self._logger.exception(error, stack_info = True)
 
             # Delete the original response, if existing
@@ -171,6 +185,387 @@ class Post_Command(Base_Cog):
             else:
                 await ctx.response.send_message(embed = embed)
 
+        finally:
+            # Free the slot (or the place in the queue) for the next command and the images still held
+            if ticket is not None:
+                ticket.release()
+            if buffers is not None:
+                buffers.close()
+
+
+    @staticmethod
+    def __get_quality_value(ctx:discord.Interaction, quality:app_commands.Choice[int] | int | None) -> int:
+        """Returns the quality chosen by the user, or the default quality of the bot config"""
+        if isinstance(quality, app_commands.Choice):
+            return quality.value
+        if quality is None:
+            return ctx.client.config.get_int("POST", "DEFAULT_QUALITY")
+        return quality
+
+    @staticmethod
+    def __build_content(subm:Submission, url:str, use_title:bool, custom_note:str | None) -> str:
+        """Returns the text of the message, the images of the post are attached to"""
+        author = subm.author.name if subm.author else "Author not found"
+        # The url is wrapped in <>, so it does not add an embed to posts linking their images as embeds
+        content = f":copyright: [{author}](<{url}>)"
+        if use_title:
+            content += f"\n# {subm.title}"
+
+        if custom_note:
+            content += f"\n> {custom_note}"
+        return content
+
+    async def __convert_images(self, ctx:discord.Interaction, buffers:Command_Buffers, image_urls:list[str], quality_value:int, on_loaded:Callable[[int], None]) -> list[Media_Buffer]:
+        """Converts the images into WebP (or takes them from the transcode cache), in the order of `image_urls`
+
+        The converted images are held by the `buffers` of the command, which write them to disk once too many bytes are in flight.
+        `on_loaded` receives the number of images available so far, each time another image has been converted"""
+        # Look up images, that have already been converted with the same settings
+        transcode_cache = ctx.client.transcode_cache
+        encoder_settings = ctx.client.transcode_engine.get_encoder_settings()
+        cache_keys = [transcode_cache.make_key(image_url, quality_value, encoder_settings) for image_url in image_urls]
+        # Cached images are read one at a time, each one is handed to the buffers (and spilled if needed) before the next is read
+        webp_images:list[Media_Buffer | None] = []
+        for cache_key in cache_keys:
+            webp_data = await transcode_cache.get(cache_key)
+            webp_images.append(None if webp_data is None else await buffers.store(webp_data))
+            del webp_data
+        missing_indices = [index for index, webp_image in enumerate(webp_images) if webp_image is None]
+        self._logger.debug("Found %s of %s images in the transcode cache", len(image_urls) - len(missing_indices), len(image_urls))
+
+        # Download and convert the remaining images, downloads run concurrently over the shared session and the conversion in the process pool
+        loaded_images = len(image_urls) - len(missing_indices)
+
+        async def convert_image(position:int, image_data:bytearray):
+            nonlocal loaded_images
+            index = missing_indices[position]
+            source_size = len(image_data)
+            buffers.hold(source_size)
+            try:
+                webp_data = await ctx.client.transcode_engine.transcode(image_data, quality_value)
+            finally:
+                # Free the download as soon as it has been encoded, only the encoded image is kept until the upload
+                del image_data
+                buffers.release(source_size)
+            await transcode_cache.put(cache_keys[index], webp_data)
+            webp_images[index] = await buffers.store(webp_data)
+            loaded_images += 1
+            on_loaded(loaded_images)
+
+        await ctx.client.media_downloader.download_all([image_urls[index] for index in missing_indices], convert_image)
+        return webp_images
+
+    @staticmethod
+    def __split_gallery(image_count:int, limit:int = MAX_ATTACHMENTS) -> list[range]:
+        """Splits the gallery into as few messages as `limit` images per message allow, with the images spread evenly across them"""
+        message_count = -(-image_count // limit)
+        bounds = [round(image_count * number / message_count) for number in range(message_count + 1)]
+        return [range(start, end) for start, end in zip(bounds, bounds[1:])]
+
+    @staticmethod
+    def __pack_gallery(image_sizes:list[int], upload_budget:int) -> list[range]:
+        """Splits the gallery into messages of up to `MAX_ATTACHMENTS` images in their order, a new message is started once the next image would exceed the upload budget
+
+        An image exceeding the budget on its own is sent in a message of its own"""
+        chunks = []
+        start = 0
+        chunk_size = 0
+        for index, image_size in enumerate(image_sizes):
+            if index > start and (index - start == MAX_ATTACHMENTS or chunk_size + image_size > upload_budget):
+                chunks.append(range(start, index))
+                start = index
+                chunk_size = 0
+            chunk_size += image_size
+        chunks.append(range(start, len(image_sizes)))
+        return chunks
+
+    @staticmethod
+    def __get_upload_budget(ctx:discord.Interaction) -> int:
+        """Returns the number of bytes a single message may attach, as the share of the upload limit of the guild configured"""
+        upload_limit = ctx.guild.filesize_limit if ctx.guild is not None else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+        return int(upload_limit * ctx.client.config.get_float("TRANSCODING", "UPLOAD_BUDGET_RATIO"))
+
+    async def __fit_chunk(self, ctx:discord.Interaction, buffers:Command_Buffers, webp_images:list[Media_Buffer], quality_value:int, upload_budget:int) -> tuple[list[Media_Buffer], bool]:
+        """Fits the images of a single message into the upload budget, instead of letting discord reject the upload
+
+        Only a message holding a single image above the budget is encoded again (below the requested quality), the others are already packed to fit.
+        Returns the images and whether they had to be encoded again"""
+        if sum(webp_image.size for webp_image in webp_images) <= upload_budget:
+            return webp_images, False
+        fitted_images = await ctx.client.transcode_engine.fit_gallery([await webp_image.read() for webp_image in webp_images], quality_value, upload_budget)
+        for webp_image in webp_images:
+            buffers.discard(webp_image)
+        return [await buffers.store(webp_data) for webp_data in fitted_images], True
+
+    async def __get_uploaded_image_urls(self, ctx:discord.Interaction, subm:Submission, image_urls:list[str], quality_value:int) -> list[str] | None:
+        """Returns fresh urls of the attachments, if the images of the post have already been uploaded with the same quality and encoder settings
+
+        Returns None if any of the images has not been uploaded yet, or the message holding it is no longer accessible"""
+        attachment_index = ctx.client.attachment_index
+        if attachment_index is None:
+            return None
+        uploaded = await attachment_index.get(subm.id, image_urls, quality_value, ctx.client.transcode_engine.get_encoder_settings())
+        if uploaded is None:
+            return None
+
+        # The urls of attachments expire after a while, fetching the message again returns freshly signed ones
+        attachment_urls:dict[int, str] = {}
+        for channel_id, message_id in dict.fromkeys((attachment.channel_id, attachment.message_id) for attachment in uploaded):
+            try:
+                message = await ctx.client.get_partial_messageable(channel_id).fetch_message(message_id)
+            except discord.NotFound:
+                self._logger.debug("The message %s holding the images of %s has been deleted, uploading them again", message_id, subm.id)
+                await attachment_index.forget_message(message_id)
+                return None
+            except discord.HTTPException as error:
+                self._logger.debug("Could not fetch the message %s holding the images of %s, uploading them again: %s", message_id, subm.id, error)
+                return None
+            attachment_urls.update((attachment.id, attachment.url) for attachment in message.attachments)
+
+        if any(attachment.attachment_id not in attachment_urls for attachment in uploaded):
+            return None
+        return [attachment_urls[attachment.attachment_id] for attachment in uploaded]
+
+    async def __record_upload(self, ctx:discord.Interaction, subm:Submission, image_urls:list[str], quality_value:int, message:discord.Message):
+        """Adds the attachments of the sent message to the attachment index, so posting the submission again can link them"""
+        attachment_index = ctx.client.attachment_index
+        if attachment_index is None or len(message.attachments) != len(image_urls):
+            return
+        try:
+            await attachment_index.put(subm.id, image_urls, quality_value, ctx.client.transcode_engine.get_encoder_settings(), message.channel.id, message.id, [attachment.id for attachment in message.attachments])
+        except Exception as error:
+            # The post has already been sent, a missing entry only means the images are uploaded again next time
+            self._logger.warning("Could not add the attachments of message %s to the index: %s", message.id, error)
+
+    async def __send_linked_post(self, ctx:discord.Interaction, content:str, url:str, attachment_urls:list[str]) -> list[discord.WebhookMessage]:
+        """Sends the messages with the already uploaded images shown as embeds, up to `MAX_LINKED_IMAGES` embeds sharing the url of the post are displayed as a gallery"""
+        messages = []
+        with POST_STAGE_SECONDS.time(stage = "discord_upload"):
+            for number, chunk in enumerate(self.__split_gallery(len(attachment_urls), MAX_LINKED_IMAGES)):
+                messages.append(await ctx.followup.send(
+                    content = content if number == 0 else discord.utils.MISSING,
+                    embeds = [discord.Embed(url = url).set_image(url = attachment_urls[index]) for index in chunk]
+                ))
+        return messages
+
+    async def __send_post(self, ctx:discord.Interaction, buffers:Command_Buffers, subm:Submission, image_urls:list[str], quality_value:int, content:str, webp_images:list[Media_Buffer]) -> list[discord.WebhookMessage]:
+        """Sends the converted images attached to a series of messages, the text of the post is part of the first one
+
+        Each message holds up to `MAX_ATTACHMENTS` images within the upload limit, an image exceeding it on its own is fitted while the previous message uploads.
+        Images spilled to disk are streamed from their file, the images of each message are freed once it has been sent"""
+        upload_budget = self.__get_upload_budget(ctx)
+        chunks = self.__pack_gallery([webp_image.size for webp_image in webp_images], upload_budget)
+        messages = []
+        next_chunk = asyncio.create_task(self.__fit_chunk(ctx, buffers, [webp_images[index] for index in chunks[0]], quality_value, upload_budget))
+        try:
+            for number, chunk in enumerate(chunks):
+                chunk_images, refitted = await next_chunk
+                if number + 1 < len(chunks):
+                    next_chunk = asyncio.create_task(self.__fit_chunk(ctx, buffers, [webp_images[index] for index in chunks[number + 1]], quality_value, upload_budget))
+
+                image_files = [discord.File(webp_image.open(), filename = f"image_{index}.webp") for index, webp_image in zip(chunk, chunk_images)]
+                with POST_STAGE_SECONDS.time(stage = "discord_upload"):
+                    message = await ctx.followup.send(
+                        content = content if number == 0 else discord.utils.MISSING,
+                        suppress_embeds = True,
+                        files = image_files
+                    )
+                MEDIA_BYTES_OUT.inc(sum(webp_image.size for webp_image in chunk_images))
+                messages.append(message)
+                # Images encoded again below the requested quality must not be linked, when the post is requested with that quality again
+                if not refitted:
+                    await self.__record_upload(ctx, subm, [image_urls[index] for index in chunk], quality_value, message)
+                for webp_image in chunk_images:
+                    buffers.discard(webp_image)
+        finally:
+            # Wait for a cancelled fit to be gone, before the buffers of the command are freed
+            next_chunk.cancel()
+            await asyncio.gather(next_chunk, return_exceptions = True)
+        return messages
+
+    @staticmethod
+    async def __send_busy(ctx:discord.Interaction):
+        """Tells the user, that the queue of the job scheduler is full"""
+        embed = discord.Embed(
+            title = "Too many requests",
+            description = "The bot is busy converting the images of other posts right now,\nplease try again in a few minutes",
+            color = 0xED4337
+        )
+        await ctx.response.send_message(embed = embed, ephemeral = True)
+
+    @staticmethod
+    async def __send_starting_up(ctx:discord.Interaction):
+        """Tells the user, that the bot has not finished its startup routine yet"""
+        embed = discord.Embed(
+            title = "Starting up",
+            description = "The bot is still starting up,\nplease try again in a few seconds",
+            color = 0xED4337
+        )
+        await ctx.response.send_message(embed = embed, ephemeral = True)
+
+    @app_commands.command(name = "post_many", description = "Post multiple posts at once, each one in a message of its own")
+    @app_commands.describe(urls = "URLs to the posts, separated by spaces", use_title = "Display the titles of the posts", quality = "Specifies the quality of the converted images, closer to 100 is better")
+    @app_commands.choices(quality = QUALITY_CHOICES)
+    async def post_many(self, ctx:discord.Interaction, urls:str, use_title:bool = True, quality:app_commands.Choice[int] = None):
+        progress:Progress_Reporter = None
+        ticket:Job_Ticket = None
+        buffers:Command_Buffers = None
+        try:
+            progress = Progress_Reporter(ctx, ctx.client.config.get_float("POST", "PROGRESS_INTERVAL"))
+            # The components of the bot are created by the startup routine, after the bot already receives commands
+            if not ctx.client.components_ready:
+                raise StartingUp
+            buffers = ctx.client.memory_budget.track()
+            begin_process = datetime.now().timestamp()
+            post_urls = [post_url for post_url in dict.fromkeys(URL_SEPARATOR.split(urls)) if post_url]
+            max_urls = ctx.client.config.get_int("POST", "MAX_URLS")
+            if not post_urls or len(post_urls) > max_urls:
+                embed = discord.Embed(
+                    title = "Invalid number of posts",
+                    description = f"Provide between `1` and `{max_urls}` urls, separated by spaces",
+                    color = 0xED4337)
+                await ctx.response.send_message(embed = embed, ephemeral = True)
+                return
+
+            # Group the urls by their platform, the posts of a platform are fetched together
+            failures:dict[int, str] = {}
+            urls_per_platform:dict[Platform_Entry, list[int]] = {}
+            for index, post_url in enumerate(post_urls):
+                platform = ctx.client.platform_registry.resolve(post_url)
+                if platform is None:
+                    failures[index] = f"The domain `{urlparse(post_url).hostname or 'not_found'}` is not supported"
+                else:
+                    urls_per_platform.setdefault(platform, []).append(index)
+            self._logger.debug("Recieved command by %s (%s) for %s posts", ctx.user, ctx.user.id, len(post_urls))
+
+            ticket = ctx.client.job_scheduler.submit(ctx.guild.id if ctx.guild is not None else None, ctx.user.id)
+            await progress.defer()
+            with POST_STAGE_SECONDS.time(stage = "platform_fetch"):
+                fetched_posts = await asyncio.gather(*(platform.fetch_many([post_urls[index] for index in indices]) for platform, indices in urls_per_platform.items()))
+
+            image_urls:dict[int, list[str]] = {}
+            submissions:dict[int, Submission] = {}
+            for (platform, indices), posts in zip(urls_per_platform.items(), fetched_posts):
+                for index, subm in zip(indices, posts):
+                    if isinstance(subm, BaseException):
+                        failures[index] = f"Could not fetch the post: `{subm}`"
+                        continue
+                    post_image_urls = platform.adapter.get_image_urls(subm)
+                    if not post_image_urls:
+                        failures[index] = "The post has no media attatched, or it is in an unsupported format"
+                        continue
+                    submissions[index] = subm
+                    image_urls[index] = post_image_urls
+
+            # Link the attachments of earlier uploads, only the remaining posts are converted
+            quality_value = self.__get_quality_value(ctx, quality)
+            linked_urls:dict[int, list[str]] = {}
+            uploaded_urls = await asyncio.gather(*(self.__get_uploaded_image_urls(ctx, submissions[index], post_image_urls, quality_value) for index, post_image_urls in image_urls.items()))
+            for index, attachment_urls in zip(list(image_urls), uploaded_urls):
+                if attachment_urls is not None:
+                    linked_urls[index] = attachment_urls
+                    del image_urls[index]
+            image_count = sum(len(post_image_urls) for post_image_urls in image_urls.values())
+
+            # Wait for a free slot, unless none of the posts has anything to convert
+            def report_position(position:int):
+                progress.update(f"`{image_count}` images of `{len(image_urls)}` posts are waiting to be converted.\nYour request is number `{position}` in the queue")
+            if image_urls:
+                await ticket.acquire(report_position)
+
+            # Convert the posts one after another, the next post is prefetched while the current one is sent.
+            # Converting all of them at once would multiply the downloads and memory of a single slot of the scheduler
+            progress_title = f"`{image_count}` images of `{len(image_urls)}` posts are going to be converted, it may take a while."
+            progress.update(progress_title + f"\n`0` of `{image_count}` have already been loaded")
+            loaded_per_post = {index: 0 for index in image_urls}
+            def report_loaded(index:int, loaded_images:int):
+                loaded_per_post[index] = loaded_images
+                progress.update(progress_title + f"\n`{sum(loaded_per_post.values())}` of `{image_count}` have already been loaded")
+            conversion_order = sorted(image_urls)
+            conversions:dict[int, asyncio.Task] = {}
+            def start_conversion(position:int):
+                if position < len(conversion_order) and conversion_order[position] not in conversions:
+                    index = conversion_order[position]
+                    conversions[index] = asyncio.create_task(self.__convert_images(ctx, buffers, image_urls[index], quality_value, lambda loaded_images: report_loaded(index, loaded_images)))
+            start_conversion(0)
+
+            # Send the posts in the order of the urls, each one as soon as it (and all posts before it) are converted
+            sent_posts = 0
+            try:
+                for index in sorted(submissions):
+                    content = self.__build_content(submissions[index], post_urls[index], use_title, None)
+                    if index not in linked_urls:
+                        position = conversion_order.index(index)
+                        start_conversion(position)
+                        start_conversion(position + 1)
+                        try:
+                            webp_images = await conversions[index]
+                        except Exception as error:
+                            self._logger.error("Could not convert the images of %s: %s", post_urls[index], error)
+                            failures[index] = f"Could not convert the images: `{error}`"
+                            continue
+                    if sent_posts == 0:
+                        progress.cancel()
+                        await ctx.delete_original_response()
+                    if index in linked_urls:
+                        await self.__send_linked_post(ctx, content, post_urls[index], linked_urls[index])
+                    else:
+                        await self.__send_post(ctx, buffers, submissions[index], image_urls[index], quality_value, content, webp_images)
+                    sent_posts += 1
+            finally:
+                # The conversions still running have to be gone, before the buffers of the command are freed
+                for conversion in conversions.values():
+                    conversion.cancel()
+                await asyncio.gather(*conversions.values(), return_exceptions = True)
+
+            progress.cancel()
+            if sent_posts == 0:
+                await ctx.delete_original_response()
+            if failures:
+                lines = "\n".join(f"- <{post_urls[index]}>: {reason}" for index, reason in sorted(failures.items()))
+                embed = discord.Embed(
+                    title = f"{len(failures)} of {len(post_urls)} posts could not be posted",
+                    description = truncate_message_with_notice(lines, 4000, "..."),
+                    color = 0xED4337)
+                await ctx.followup.send(embed = embed, ephemeral = True)
+            POST_STAGE_SECONDS.observe(datetime.now().timestamp() - begin_process, stage = "total")
+
+            self._logger.info("Processed the command executed by %s (%s) after %s, %s of %s posts sent", ctx.user.name, ctx.user.id, get_elapsed_time_milliseconds(datetime.now().timestamp() - begin_process), sent_posts, len(post_urls))
+
+        except StartingUp:
+            self._logger.warning("Rejected command by %s (%s), the bot is still starting up", ctx.user.name, ctx.user.id)
+            await self.__send_starting_up(ctx)
+
+        except SchedulerBusy:
+            self._logger.warning("Rejected command by %s (%s), the job queue is full", ctx.user.name, ctx.user.id)
+            await self.__send_busy(ctx)
+
+        except Exception as error:
+            if progress is not None:
+                progress.cancel()
+            self._logger.error("Could not complete command by %s (%s)", ctx.user.name, ctx.user.id)
+            self._logger.exception(error, stack_info = True)
+
+            try:
+                await ctx.delete_original_response()
+            except discord.NotFound:
+                pass
+            embed = discord.Embed(
+                title = "Error while processing",
+                description = f"While we processed your request, the following exception occured: `{error}`",
+                color = 0xED4337
+            )
+            if ctx.response.is_done():
+                await ctx.followup.send(embed = embed, ephemeral = True)
+            else:
+                await ctx.response.send_message(embed = embed)
+
+        finally:
+            if ticket is not None:
+                ticket.release()
+            if buffers is not None:
+                buffers.close()
+
 
 async def setup(bot:commands.Bot):
     await bot.add_cog(Post_Command(bot))
\ No newline at end of file
@@ -0,0 +1,119 @@
+from datetime import datetime
+from utils.logger.custom_logging import Custom_Logger
+import logging
+from utils.adv_configparser import Advanced_ConfigParser
+from utils.datetime_tools import get_elapsed_time_big
+from pathlib import Path
+import aiohttp
+import asyncio
+import signal
+import sys
+
+# Initialize the logger
+Custom_Logger.initialize()
+launcher_logger = logging.getLogger("app.launcher")
+
+source_path = Path(__file__).resolve()
+base_path = source_path.parents[1]
+
+class Shard_Launcher:
+    """Spreads the shards of the bot across multiple worker processes, each running `main.py` with a range of shards
+
+    Workers that exit with an error are restarted, with an increasing delay for workers crashing repeatedly."""
+    VERSION = "1.0"
+    GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+    IDENTIFY_INTERVAL = 5
+    MAX_RESTART_DELAY = 300
+
+    def __init__(self, token:str, processes:int, shard_count:int = 0):
+        """Initializes the launcher, a shard count of 0 uses the number of shards recommended by discord"""
+        self.__token = token
+        self.__processes = max(1, processes)
+        self.__shard_count = shard_count
+        self.__max_concurrency = 1
+        self.__workers:dict[int, asyncio.subprocess.Process] = {}
+        self.__stopping = False
+
+    async def __fetch_gateway_info(self):
+        """Asks discord for the recommended number of shards and how many of them may identify at once"""
+        async with aiohttp.ClientSession() as session:
+            async with session.get(self.GATEWAY_URL, headers = {"Authorization": f"Bot {self.__token}"}) as response:
+                response.raise_for_status()
+                gateway_info = await response.json()
+        if not self.__shard_count:
+            self.__shard_count = gateway_info["shards"]
+        self.__max_concurrency = gateway_info["session_start_limit"]["max_concurrency"]
+
+    @staticmethod
+    def split_shards(shard_count:int, processes:int) -> list[list[int]]:
+        """Splits the shard ids into contiguous ranges of (almost) the same size, one for each process"""
+        processes = min(processes, shard_count)
+        ranges = []
+        start = 0
+        for worker_index in range(processes):
+            size = shard_count // processes + (1 if worker_index < shard_count % processes else 0)
+            ranges.append(list(range(start, start + size)))
+            start += size
+        return ranges
+
+    async def __run_worker(self, worker_index:int, shard_ids:list[int], start_delay:float):
+        """Starts the worker after the delay and restarts it, until it exited cleanly or the launcher is stopping"""
+        await asyncio.sleep(start_delay)
+        restart_delay = self.IDENTIFY_INTERVAL
+        while not self.__stopping:
+            launcher_logger.info(f"Starting worker {worker_index} with shards {shard_ids} of {self.__shard_count}")
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, str(source_path.parent / "main.py"),
+                "--shard-ids", ",".join(map(str, shard_ids)),
+                "--shard-count", str(self.__shard_count),
+                "--worker-index", str(worker_index)
+            )
+            self.__workers[worker_index] = process
+            started = datetime.now().timestamp()
+            return_code = await process.wait()
+
+            if return_code == 0 or self.__stopping:
+                launcher_logger.info(f"Worker {worker_index} exited with code {return_code}")
+                return
+
+            # Workers that ran for a while are considered healthy again
+            if datetime.now().timestamp() - started > self.MAX_RESTART_DELAY:
+                restart_delay = self.IDENTIFY_INTERVAL
+            launcher_logger.error(f"Worker {worker_index} exited with code {return_code}, restarting in {restart_delay}s")
+            await asyncio.sleep(restart_delay)
+            restart_delay = min(restart_delay * 2, self.MAX_RESTART_DELAY)
+
+    def stop(self):
+        """Terminates all workers"""
+        self.__stopping = True
+        for process in self.__workers.values():
+            if process.returncode is None:
+                process.terminate()
+
+    async def run(self):
+        """Starts all workers and waits for them to exit"""
+        await self.__fetch_gateway_info()
+        shard_ranges = self.split_shards(self.__shard_count, self.__processes)
+        launcher_logger.info(f"Spreading {self.__shard_count} shards across {len(shard_ranges)} processes (max concurrency {self.__max_concurrency})")
+
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, self.stop)
+
+        # Stagger the workers, discord only allows `max_concurrency` shards to identify every 5 seconds
+        tasks = []
+        start_delay = 0
+        for worker_index, shard_ids in enumerate(shard_ranges):
+            tasks.append(asyncio.create_task(self.__run_worker(worker_index, shard_ids, start_delay)))
+            start_delay += self.IDENTIFY_INTERVAL * -(-len(shard_ids) // self.__max_concurrency)
+        await asyncio.gather(*tasks)
+
+if __name__ == "__main__":
+    startup = datetime.now().timestamp()
+    bot_config = Advanced_ConfigParser(Path.joinpath(base_path, "config", "bot.ini"))
+    if bot_config["SHARDING"]["MODE"] != "multiprocess":
+        launcher_logger.warning(f"Sharding mode is '{bot_config['SHARDING']['MODE']}', set it to 'multiprocess' to spread the shards across processes")
+
+    launcher = Shard_Launcher(bot_config["DISCORD"]["TOKEN"], bot_config.getint("SHARDING", "PROCESSES"), bot_config.getint("SHARDING", "SHARD_COUNT"))
+    asyncio.run(launcher.run())
+    launcher_logger.info(f"Exiting. Launcher ran for {get_elapsed_time_big(datetime.now().timestamp() - startup)}")
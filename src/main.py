@@ -2,6 +2,8 @@ from datetime import datetime
 from utils.logger.custom_logging import Custom_Logger
 import logging
 from utils.adv_configparser import Advanced_ConfigParser
+from utils.config_service import Config_Service
+from utils.loop_monitor import Loop_Monitor
 from utils.datetime_tools import get_elapsed_time_smal, get_elapsed_time_big, get_elapsed_time_milliseconds
 import discord
 from discord.ext import commands
@@ -10,44 +12,63 @@ import re
 import sys
 import traceback
 import asyncio
-from typing import Union
+import argparse
+from typing import Any, Awaitable, Union
 from platforms.reddit import Reddit_Adapter
+from platforms.registry import Platform_Registry
+from pipeline.downloader import Media_Downloader
+from pipeline.transcoder import Transcode_Engine
+from pipeline.transcode_cache import Transcode_Cache
+from pipeline.attachment_index import Attachment_Index
+from pipeline.media_buffer import Memory_Budget
+from pipeline.scheduler import Job_Scheduler
+from utils.metrics import Metrics_Registry
+from utils.metrics_exporter import Metrics_Exporter
+from utils.tree_fingerprint import Tree_Fingerprint
 from const import VERSION
+import aiohttp
 
-print("      ____  ____  ___________    __________")
-print("     / __ \/ __ \/ ___/_  __/   /  _/_  __/")
-print("    / /_/ / / / /\__ \ / /_____ / /  / /   ")
-print("   / ____/ /_/ /___/ // /_____// /  / /    ")
-print(f"  /_/    \____//____//_/     /___/ /_/ v{VERSION}")
-print("  Copyright (c) 2024-2025 Lars Winzer")
-print()
-print("  Source: https://github.com/official-Cromatin/Post-It")
-print("  Report an Issue: https://github.com/official-Cromatin/Post-It/issues/new?assignees=&labels=bug&projects=&template=issue_report.yml")
-print("\n")
 startup = datetime.now().timestamp()
 
-# Initialize the logger
-Custom_Logger.initialize()
 app_logger = logging.getLogger("app")
 startup_logger = logging.getLogger("app.startup")
 
 source_path = Path(__file__).resolve()
 base_path = source_path.parents[1]
-app_logger.info(f"Using the following path as entrypoint: '{base_path}'")
 
 intents = discord.Intents.default()
 intents.messages = True
 
-class MyBot(commands.Bot):
-    def __init__(self):
-        super().__init__(command_prefix=None, help_command=None, intents=intents)
+class MyBot(commands.AutoShardedBot):
+    # Options of the bot config, that are only read once at startup
+    RESTART_SECTIONS = ("DISCORD", "LOGGING", "METRICS", "SHARDING", "CONFIG")
+    RESTART_OPTIONS = ("NETWORK.CONNECTION_LIMIT", "NETWORK.CONNECTION_LIMIT_PER_HOST", "NETWORK.DNS_CACHE_TTL", "NETWORK.KEEPALIVE_TIMEOUT", "NETWORK.REQUEST_TIMEOUT", "TRANSCODING.WORKERS", "TRANSCODING.MAX_IMAGE_PIXELS", "CACHE.DIRECTORY", "ATTACHMENT_INDEX.ENABLED", "ATTACHMENT_INDEX.DATABASE", "MEMORY.SPILL_DIRECTORY", "LOOP_MONITOR.INTERVAL")
+
+    def __init__(self, shard_ids:list[int] = None, shard_count:int = None, worker_index:int = 0, force_sync:bool = False):
+        super().__init__(command_prefix=None, help_command=None, intents=intents, shard_ids=shard_ids, shard_count=shard_count)
         self.__first_on_ready = False
+        self.WORKER_INDEX = worker_index
+        self.__force_sync = force_sync
+        self.tree_fingerprint = Tree_Fingerprint(Path.joinpath(base_path, "data", "command_tree.json"))
+        self.profile_directory = Path.joinpath(base_path, "data", "profiles")
 
         self.VERSION = VERSION
         self.STARTUP_TIMESTAMP: float = None
         self.platforms_config: Advanced_ConfigParser = None
         self.bot_config: Advanced_ConfigParser = None
-        self.reddit_adapter: Reddit_Adapter = None
+        self.config: Config_Service = None
+        self.platform_registry: Platform_Registry = Platform_Registry()
+        self.http_session: aiohttp.ClientSession = None
+        self.media_downloader: Media_Downloader = None
+        self.transcode_engine: Transcode_Engine = None
+        self.transcode_cache: Transcode_Cache = None
+        self.attachment_index: Attachment_Index = None
+        self.memory_budget: Memory_Budget = None
+        self.loop_monitor: Loop_Monitor = None
+        self.job_scheduler: Job_Scheduler = None
+        self.metrics_exporter: Metrics_Exporter = None
+        # Commands arriving before the startup routine created the components are turned away
+        self.components_ready: bool = False
         
         self.no_executed_commands:int = 0
         self.no_succeeded_commands:int = 0
@@ -57,7 +78,25 @@ class MyBot(commands.Bot):
         # Register cogs to handle commands
         for cog_name in ["debug", "post"]:
             await self.load_extension(f"cogs.{cog_name}")
-        await self.tree.sync()
+        # The command tree is global, one process is enough to sync it
+        if self.WORKER_INDEX == 0:
+            await self.sync_command_tree(self.__force_sync)
+
+    async def sync_command_tree(self, force:bool = False) -> bool:
+        """Syncs the command tree with discord, unless it did not change since the last sync
+
+        Returns True, if the tree has been synced"""
+        fingerprint = Tree_Fingerprint.compute(self.tree, self.application_id)
+        if not force and self.tree_fingerprint.matches(fingerprint):
+            startup_logger.info(f"Command tree unchanged since the last sync, skipped syncing (saved about {get_elapsed_time_milliseconds(self.tree_fingerprint.get_last_sync_duration())})")
+            return False
+
+        task_start = datetime.now().timestamp()
+        synced_commands = await self.tree.sync()
+        sync_duration = datetime.now().timestamp() - task_start
+        self.tree_fingerprint.store(fingerprint, sync_duration)
+        startup_logger.info(f"Synced {len(synced_commands)} commands after {get_elapsed_time_milliseconds(sync_duration)}{' (forced)' if force else ''}")
+        return True
 
     async def on_app_command_completion(self, interaction: discord.Interaction, command: Union[discord.app_commands.Command, discord.app_commands.ContextMenu]):
         """Called when a `app_commands.Command` or `app_commands.ContextMenu` has successfully completed without error"""
@@ -80,6 +119,8 @@ class MyBot(commands.Bot):
     async def on_connect(self):
         """A coroutine to be called to setup the bot, after the bot is logged in but before it has connected to the Websocket"""
         if not self.__first_on_ready:
+            # Every shard connects on its own, mark the routine as started before the first await
+            self.__first_on_ready = True
             startup_logger.info("Beginning startup routine ...")
             routine_begin = datetime.now().timestamp()
             await self.change_presence(status = discord.Status.dnd, activity = discord.CustomActivity("Executing pre startup routine"))
@@ -91,48 +132,296 @@ class MyBot(commands.Bot):
             self.platforms_config = platforms_config
             startup_logger.info(f"Loaded platforms config after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
 
-            # Create platforms adapter
+            # Register the platforms, their adapters are created once they are used for the first time
+            startup_logger.debug("Registering platforms ...")
+            self.platform_registry.register(Reddit_Adapter.PLATFORM_NAME, Reddit_Adapter.HOSTNAMES, lambda: Reddit_Adapter(
+                platforms_config["REDDIT"]["CLIENT_ID"],
+                platforms_config["REDDIT"]["CLIENT_SECRET"],
+                platforms_config.getfloat("REDDIT", "CACHE_TTL"),
+                platforms_config.getint("REDDIT", "CACHE_SIZE")
+            ), exact_hostnames = Reddit_Adapter.EXACT_HOSTNAMES)
+            startup_logger.info(f"Registered {len(self.platform_registry.get_platforms())} platforms")
+
+            # Create the shared http session, reused by every command to keep connections alive
+            task_start = datetime.now().timestamp()
+            startup_logger.debug("Creating http session ...")
+            connector = aiohttp.TCPConnector(
+                limit = self.bot_config.getint("NETWORK", "CONNECTION_LIMIT"),
+                limit_per_host = self.bot_config.getint("NETWORK", "CONNECTION_LIMIT_PER_HOST"),
+                ttl_dns_cache = self.bot_config.getint("NETWORK", "DNS_CACHE_TTL"),
+                keepalive_timeout = self.bot_config.getint("NETWORK", "KEEPALIVE_TIMEOUT")
+            )
+            self.http_session = aiohttp.ClientSession(
+                connector = connector,
+                timeout = aiohttp.ClientTimeout(total = self.bot_config.getint("NETWORK", "REQUEST_TIMEOUT"))
+            )
+            self.media_downloader = Media_Downloader(
+                self.http_session,
+                self.bot_config.getint("NETWORK", "MAX_CONCURRENT_DOWNLOADS"),
+                self.bot_config.getint("NETWORK", "MAX_DOWNLOAD_SIZE_MB") * 1024 * 1024
+            )
+            startup_logger.info(f"Created http session after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
+
+            # Create the process pool, the images are converted in
             task_start = datetime.now().timestamp()
-            startup_logger.debug("Creating reddit adapter ...")
-            self.reddit_adapter = Reddit_Adapter(platforms_config["REDDIT"]["CLIENT_ID"], platforms_config["REDDIT"]["CLIENT_SECRET"])
-            startup_logger.info(f"Created reddit adapter after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
+            startup_logger.debug("Creating transcode engine ...")
+            self.transcode_engine = Transcode_Engine(
+                self.bot_config.getint("TRANSCODING", "WORKERS"),
+                self.bot_config.getfloat("TRANSCODING", "JOB_TIMEOUT"),
+                self.bot_config.getint("TRANSCODING", "MIN_QUALITY"),
+                self.bot_config.getint("TRANSCODING", "MAX_FIT_ATTEMPTS"),
+                self.bot_config.getint("TRANSCODING", "MAX_EDGE"),
+                self.bot_config.getint("TRANSCODING", "MAX_IMAGE_PIXELS"),
+                self.__get_animation_limits()
+            )
+            startup_logger.info(f"Created transcode engine with {self.transcode_engine.get_worker_count()} workers after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
+
+            # Load the cache of already converted images
+            task_start = datetime.now().timestamp()
+            startup_logger.debug("Loading transcode cache ...")
+            self.transcode_cache = Transcode_Cache(Path.joinpath(base_path, self.bot_config["CACHE"]["DIRECTORY"]), self.bot_config.getint("CACHE", "MAX_SIZE_MB") * 1024 * 1024)
+            startup_logger.info(f"Loaded transcode cache with {self.transcode_cache.get_entry_count()} entries after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
+
+            # Open the index of images already uploaded to discord, if enabled
+            if self.bot_config.getboolean("ATTACHMENT_INDEX", "ENABLED"):
+                task_start = datetime.now().timestamp()
+                self.attachment_index = Attachment_Index(Path.joinpath(base_path, self.bot_config["ATTACHMENT_INDEX"]["DATABASE"]), self.bot_config.getint("ATTACHMENT_INDEX", "MAX_ENTRIES"))
+                startup_logger.info(f"Opened attachment index with {self.attachment_index.get_entry_count()} entries after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
+
+            # Track the images held by the commands, galleries waiting for their upload are written to disk above the threshold
+            self.memory_budget = Memory_Budget(self.bot_config.getint("MEMORY", "SPILL_THRESHOLD_MB") * 1024 * 1024, self.bot_config["MEMORY"]["SPILL_DIRECTORY"])
+            startup_logger.info(f"Created memory budget, spilling images to disk above {self.bot_config.getint('MEMORY', 'SPILL_THRESHOLD_MB')}MB")
+
+            # Limit the number of commands converting images at once, the remaining ones wait in a queue
+            self.job_scheduler = Job_Scheduler(
+                self.bot_config.getint("SCHEDULER", "MAX_CONCURRENT_JOBS"),
+                self.bot_config.getint("SCHEDULER", "MAX_QUEUE_LENGTH")
+            )
+            startup_logger.info(f"Created job scheduler with {self.job_scheduler.get_max_concurrent_jobs()} concurrent jobs")
+
+            # Measure the lag of the event loop, callbacks blocking it are logged with their stack
+            self.loop_monitor = Loop_Monitor(self.bot_config.getfloat("LOOP_MONITOR", "INTERVAL"), self.bot_config.getfloat("LOOP_MONITOR", "BLOCK_THRESHOLD"))
+            self.loop_monitor.start()
+            startup_logger.info(f"Started loop monitor, reporting blocks longer than {self.bot_config.getfloat('LOOP_MONITOR', 'BLOCK_THRESHOLD') * 1000:.0f}ms")
+            self.components_ready = True
+
+            # Expose the metrics of the process, if enabled
+            self.__register_metrics()
+            if self.bot_config.getboolean("METRICS", "ENABLED"):
+                task_start = datetime.now().timestamp()
+                startup_logger.debug("Starting metrics exporter ...")
+                # Each process of the launcher listens on its own port
+                self.metrics_exporter = Metrics_Exporter(self.bot_config["METRICS"]["HOST"], self.bot_config.getint("METRICS", "PORT") + self.WORKER_INDEX)
+                await self.metrics_exporter.start()
+                startup_logger.info(f"Started metrics exporter after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
+
+            # Apply changes of the bot config at runtime
+            self.config.add_reload_callback(self.__apply_config)
+            if self.config.get_float("CONFIG", "WATCH_INTERVAL") > 0:
+                self.config.start_watching()
+
+            # Prepare everything the first command would otherwise have to wait for
+            if self.bot_config.getboolean("WARM_UP", "ENABLED"):
+                task_start = datetime.now().timestamp()
+                startup_logger.debug("Warming up ...")
+                await self.__warm_up()
+                startup_logger.info(f"Finished warm-up after {get_elapsed_time_milliseconds(datetime.now().timestamp() - task_start)}")
 
             await self.change_presence(status = discord.Status.online, activity = None)
             startup_logger.info(f"Startup routine finished after {get_elapsed_time_milliseconds(datetime.now().timestamp() - routine_begin)}")
-            self.__first_on_ready = True
         else:
             startup_logger.info("Startup routine allready executed, omitting this execution")
 
+    async def __warm_up(self):
+        """Authenticates with the platforms, opens connections to their media hosts and starts the transcoding workers, all steps run concurrently
+
+        A failing step is logged and only means the first command has to do the work instead"""
+        async def timed_step(name:str, step:Awaitable[Any]):
+            step_start = datetime.now().timestamp()
+            startup_logger.debug(f"Warming up {name} ...")
+            try:
+                result = await step
+            except Exception as error:
+                startup_logger.warning(f"Could not warm up {name} after {get_elapsed_time_milliseconds(datetime.now().timestamp() - step_start)}: {error}")
+            else:
+                startup_logger.info(f"Warmed up {name} ({result}) after {get_elapsed_time_milliseconds(datetime.now().timestamp() - step_start)}")
+
+        steps = []
+        media_urls = []
+        for platform in self.platform_registry.get_platforms():
+            if hasattr(platform.adapter, "warm_up"):
+                steps.append(timed_step(f"{platform.name} authentication", platform.adapter.warm_up()))
+            if hasattr(platform.adapter, "get_media_base_url"):
+                media_urls.append(f"{platform.adapter.get_media_base_url()}/")
+        if media_urls:
+            connections = self.bot_config.getint("WARM_UP", "CONNECTIONS")
+            steps.append(timed_step("media hosts", self.media_downloader.warm_up(media_urls, connections)))
+        steps.append(timed_step("transcoding workers", self.transcode_engine.warm_up()))
+        await asyncio.gather(*steps)
+
+    def __register_metrics(self):
+        """Registers the metrics, whose values are read from the bot and its components when collected"""
+        registry = Metrics_Registry.instance()
+        registry.callback("postit_gateway_latency_seconds", "Latency of the heartbeat to the discord gateway", lambda: self.latency)
+        registry.callback("postit_guilds", "Number of guilds the bot is a member of", lambda: len(self.guilds))
+        registry.callback("postit_commands_executed_total", "Number of executed application commands", lambda: self.no_executed_commands, "counter")
+        registry.callback("postit_commands_succeeded_total", "Number of application commands completed without error", lambda: self.no_succeeded_commands, "counter")
+        registry.callback("postit_commands_failed_total", "Number of application commands failed with an error", lambda: self.no_failed_commands, "counter")
+        reddit = self.platform_registry.get(Reddit_Adapter.PLATFORM_NAME)
+        registry.callback("postit_reddit_requests_total", "Number of requests made to the reddit api", lambda: reddit.adapter.get_total_requests() if reddit.is_constructed() else 0, "counter")
+        registry.callback("postit_reddit_cache_hits_total", "Number of reddit fetches answered without a request", lambda: reddit.adapter.get_total_cache_hits() if reddit.is_constructed() else 0, "counter")
+        registry.callback("postit_reddit_ratelimit_remaining", "Number of requests left in the current rate limit window of reddit", lambda: (reddit.adapter.get_rate_limit().get_remaining() or 0) if reddit.is_constructed() else 0)
+        registry.callback("postit_reddit_fetch_failures_total", "Number of failed fetches through the reddit adapter", lambda: reddit.stats.failed_fetches, "counter")
+        registry.callback("postit_transcode_queue_depth", "Number of transcoding jobs waiting for a free worker", lambda: self.transcode_engine.get_queue_depth())
+        registry.callback("postit_transcode_pending_jobs", "Number of transcoding jobs queued or in progress", lambda: self.transcode_engine.get_pending_jobs())
+        registry.callback("postit_post_jobs_running", "Number of post commands admitted by the job scheduler", lambda: self.job_scheduler.get_running_jobs())
+        registry.callback("postit_post_jobs_queued", "Number of post commands waiting in the queue of the job scheduler", lambda: self.job_scheduler.get_queued_jobs())
+        registry.callback("postit_post_jobs_rejected_total", "Number of post commands rejected, because the queue was full", lambda: self.job_scheduler.get_rejected_jobs(), "counter")
+        registry.callback("postit_transcode_cache_hits_total", "Number of images served from the transcode cache", lambda: self.transcode_cache.get_hits(), "counter")
+        registry.callback("postit_transcode_cache_misses_total", "Number of images not found in the transcode cache", lambda: self.transcode_cache.get_misses(), "counter")
+        registry.callback("postit_transcode_cache_bytes", "Number of bytes stored in the transcode cache", lambda: self.transcode_cache.get_size())
+        registry.callback("postit_event_loop_lag_p99_seconds", "99th percentile of the event loop lag over the recent samples", lambda: self.loop_monitor.get_lag_percentile(99))
+        registry.callback("postit_event_loop_blocked_total", "Number of times the event loop has been blocked longer than the threshold", lambda: self.loop_monitor.get_blocked_calls(), "counter")
+        registry.callback("postit_media_bytes_in_flight", "Number of bytes of media currently held in memory by the commands", lambda: self.memory_budget.get_bytes_in_flight())
+        registry.callback("postit_media_spilled_bytes_total", "Number of bytes of converted images written to disk instead of being held in memory", lambda: self.memory_budget.get_spilled_bytes(), "counter")
+        if self.attachment_index is not None:
+            registry.callback("postit_attachment_index_hits_total", "Number of posts linking the attachments of an earlier upload", lambda: self.attachment_index.get_hits(), "counter")
+            registry.callback("postit_attachment_index_misses_total", "Number of posts whose images had to be uploaded", lambda: self.attachment_index.get_misses(), "counter")
+
+    def __get_animation_limits(self) -> tuple[int, float, int, bool]:
+        """Returns the limits for converting animations, in the order expected by the `Transcode_Engine`"""
+        return (
+            self.config.get_int("TRANSCODING", "MAX_ANIMATION_FRAMES"),
+            self.config.get_float("TRANSCODING", "MAX_ANIMATION_DURATION"),
+            self.config.get_int("TRANSCODING", "MAX_ANIMATION_EDGE"),
+            self.config.get_bool("TRANSCODING", "DROP_FRAMES")
+        )
+
+    def __apply_config(self, changed_options:set[tuple[str, str]]):
+        """Passes the changed tuning options of the bot config to the running components, work in progress keeps its settings"""
+        changed = {f"{section}.{option}".upper() for section, option in changed_options}
+        config = self.config
+        if changed & {"SCHEDULER.MAX_CONCURRENT_JOBS", "SCHEDULER.MAX_QUEUE_LENGTH"}:
+            self.job_scheduler.set_limits(config.get_int("SCHEDULER", "MAX_CONCURRENT_JOBS"), config.get_int("SCHEDULER", "MAX_QUEUE_LENGTH"))
+        if changed & {"NETWORK.MAX_CONCURRENT_DOWNLOADS", "NETWORK.MAX_DOWNLOAD_SIZE_MB"}:
+            self.media_downloader.set_limits(config.get_int("NETWORK", "MAX_CONCURRENT_DOWNLOADS"), config.get_int("NETWORK", "MAX_DOWNLOAD_SIZE_MB") * 1024 * 1024)
+        if changed & {"TRANSCODING.JOB_TIMEOUT", "TRANSCODING.MIN_QUALITY", "TRANSCODING.MAX_FIT_ATTEMPTS", "TRANSCODING.MAX_EDGE"}:
+            self.transcode_engine.update_settings(
+                config.get_float("TRANSCODING", "JOB_TIMEOUT"),
+                config.get_int("TRANSCODING", "MIN_QUALITY"),
+                config.get_int("TRANSCODING", "MAX_FIT_ATTEMPTS"),
+                config.get_int("TRANSCODING", "MAX_EDGE")
+            )
+        if changed & {"TRANSCODING.MAX_ANIMATION_FRAMES", "TRANSCODING.MAX_ANIMATION_DURATION", "TRANSCODING.MAX_ANIMATION_EDGE", "TRANSCODING.DROP_FRAMES"}:
+            self.transcode_engine.update_animation_limits(self.__get_animation_limits())
+        if "ATTACHMENT_INDEX.MAX_ENTRIES" in changed and self.attachment_index is not None:
+            self.attachment_index.set_max_entries(config.get_int("ATTACHMENT_INDEX", "MAX_ENTRIES"))
+        if "LOOP_MONITOR.BLOCK_THRESHOLD" in changed:
+            self.loop_monitor.set_block_threshold(config.get_float("LOOP_MONITOR", "BLOCK_THRESHOLD"))
+        if "MEMORY.SPILL_THRESHOLD_MB" in changed:
+            self.memory_budget.set_spill_threshold(config.get_int("MEMORY", "SPILL_THRESHOLD_MB") * 1024 * 1024)
+        if "CACHE.MAX_SIZE_MB" in changed:
+            self.transcode_cache.set_max_size(config.get_int("CACHE", "MAX_SIZE_MB") * 1024 * 1024)
+
+        # Options read by the commands themselves (like POST.DEFAULT_QUALITY) apply to the next command without any action
+        requires_restart = sorted(option for option in changed if option.split(".")[0] in self.RESTART_SECTIONS or option in self.RESTART_OPTIONS)
+        if requires_restart:
+            app_logger.warning(f"The changed options {', '.join(requires_restart)} take effect after a restart")
+
+    async def close(self):
+        """Closes the shared resources of the bot, before closing the connection to discord"""
+        if self.config is not None:
+            self.config.stop_watching()
+        if self.metrics_exporter is not None:
+            await self.metrics_exporter.stop()
+        if self.loop_monitor is not None:
+            self.loop_monitor.stop()
+        await self.platform_registry.close()
+        if self.http_session is not None and not self.http_session.closed:
+            await self.http_session.close()
+            app_logger.debug("Closed the shared http session")
+        if self.transcode_engine is not None:
+            self.transcode_engine.shutdown()
+            app_logger.debug("Shut down the transcode engine")
+        if self.attachment_index is not None:
+            self.attachment_index.close()
+        await super().close()
+
     async def on_ready(self):
         app_logger.info(f"Successfully logged in (after {get_elapsed_time_smal(datetime.now().timestamp() - startup)}) as {self.user}")
 
-bot = MyBot()
-bot.STARTUP_TIMESTAMP = startup
-bot.bot_config = Advanced_ConfigParser(Path.joinpath(base_path, "config", "bot.ini"))
-if re.match(r'[A-Za-z\d]{24}\.[\w-]{6}\.[\w-]{27}', bot.bot_config["DISCORD"]["TOKEN"]):
-    app_logger.critical("Bot (config/bot.ini) configuration invalid, please set a valid token")
-    quit(1)
-elif bot.bot_config.compare_to_template() not in ("equal", "config_minus"):
-    app_logger.critical("Bot (config/bot.ini) configuration is missing some parts. Make sure it at least has all the same keys as the template")
-    quit(1)
-else:
-    app_logger.info("Bot configuration valid, continuing with startup")
-
-# Setup handlers to handle states of command execution
-@bot.tree.error
-async def on_app_command_error(ctx:discord.Interaction, error):
-    """Executed when exception during command execution occurs"""
-    print('Ignoring exception in command {}:'.format(ctx.command), file=sys.stderr)
-    traceback.print_exception(type(error), error, error.__traceback__)
-
-    bot.no_failed_commands += 1
-
-try:
-    bot.run(bot.bot_config["DISCORD"]["TOKEN"], log_handler = None)
-except discord.errors.LoginFailure:
-    app_logger.critical("Improper token has been passed. Aborting startup")
-    quit(1)
-
-app_logger.info("Quitting application ...")
-asyncio.run(bot.close())
-app_logger.info(f"Exiting. Application ran for {get_elapsed_time_big(datetime.now().timestamp() - startup)}")
\ No newline at end of file
+if __name__ == "__main__":
+    # The workers of the transcode engine import this module again, only the process started as entrypoint runs the bot
+    print("      ____  ____  ___________    __________")
+    print("     / __ \/ __ \/ ___/_  __/   /  _/_  __/")
+    print("    / /_/ / / / /\__ \ / /_____ / /  / /   ")
+    print("   / ____/ /_/ /___/ // /_____// /  / /    ")
+    print(f"  /_/    \____//____//_/     /___/ /_/ v{VERSION}")
+    print("  Copyright (c) 2024-2025 Lars Winzer")
+    print()
+    print("  Source: https://github.com/official-Cromatin/Post-It")
+    print("  Report an Issue: https://github.com/official-Cromatin/Post-It/issues/new?assignees=&labels=bug&projects=&template=issue_report.yml")
+    print("\n")
+
+    # Initialize the logger
+    Custom_Logger.initialize()
+    app_logger.info(f"Using the following path as entrypoint: '{base_path}'")
+
+    # Arguments passed by the launcher (src/launcher.py), when the shards are spread across multiple processes
+    argument_parser = argparse.ArgumentParser(description = "Post-It discord bot")
+    argument_parser.add_argument("--shard-ids", type = lambda value: [int(shard_id) for shard_id in value.split(",")], default = None, help = "Comma separated ids of the shards to run in this process")
+    argument_parser.add_argument("--shard-count", type = int, default = None, help = "Total number of shards across all processes")
+    argument_parser.add_argument("--worker-index", type = int, default = 0, help = "Index of this process, when started by the launcher")
+    argument_parser.add_argument("--force-sync", action = "store_true", help = "Sync the command tree with discord, even if it did not change since the last sync")
+    arguments = argument_parser.parse_args()
+
+    bot_config = Advanced_ConfigParser(Path.joinpath(base_path, "config", "bot.ini"))
+    # Apply the format and file of the logs, each process of the launcher writes into its own file
+    log_file = bot_config["LOGGING"]["FILE"]
+    if log_file:
+        log_file = Path.joinpath(base_path, log_file)
+        if arguments.worker_index:
+            log_file = log_file.with_stem(f"{log_file.stem}.{arguments.worker_index}")
+        log_file.parent.mkdir(parents = True, exist_ok = True)
+    Custom_Logger.configure(bot_config["LOGGING"]["FORMAT"], log_file, bot_config.getint("LOGGING", "FILE_MAX_SIZE_MB") * 1024 * 1024, bot_config.getint("LOGGING", "FILE_BACKUP_COUNT"))
+    if arguments.shard_ids is not None:
+        # Started by the launcher, the shards have already been assigned
+        shard_count = arguments.shard_count
+    elif bot_config["SHARDING"]["MODE"] in ("auto", "multiprocess"):
+        if bot_config["SHARDING"]["MODE"] == "multiprocess":
+            app_logger.warning("Sharding mode is 'multiprocess', but no shards were assigned. Start the bot with src/launcher.py to spread the shards across processes, running all shards in this process")
+        # Without a configured count, discord recommends the number of shards
+        shard_count = bot_config.getint("SHARDING", "SHARD_COUNT") or None
+    else:
+        shard_count = 1
+    bot = MyBot(arguments.shard_ids, shard_count, arguments.worker_index, arguments.force_sync)
+    bot.STARTUP_TIMESTAMP = startup
+    bot.bot_config = bot_config
+    bot.config = Config_Service(bot_config, bot_config.getfloat("CONFIG", "WATCH_INTERVAL"))
+    if re.match(r'[A-Za-z\d]{24}\.[\w-]{6}\.[\w-]{27}', bot.bot_config["DISCORD"]["TOKEN"]):
+        app_logger.critical("Bot (config/bot.ini) configuration invalid, please set a valid token")
+        quit(1)
+    elif bot.bot_config.compare_to_template() not in ("equal", "config_minus"):
+        app_logger.critical("Bot (config/bot.ini) configuration is missing some parts. Make sure it at least has all the same keys as the template")
+        quit(1)
+    else:
+        app_logger.info("Bot configuration valid, continuing with startup")
+
+    # Setup handlers to handle states of command execution
+    @bot.tree.error
+    async def on_app_command_error(ctx:discord.Interaction, error):
+        """Executed when exception during command execution occurs"""
+        print('Ignoring exception in command {}:'.format(ctx.command), file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+        bot.no_failed_commands += 1
+
+    try:
+        bot.run(bot.bot_config["DISCORD"]["TOKEN"], log_handler = None)
+    except discord.errors.LoginFailure:
+        app_logger.critical("Improper token has been passed. Aborting startup")
+        quit(1)
+
+    app_logger.info("Quitting application ...")
+    asyncio.run(bot.close())
+    app_logger.info(f"Exiting. Application ran for {get_elapsed_time_big(datetime.now().timestamp() - startup)}")
\ No newline at end of file
@@ -0,0 +1,104 @@
+from io import BytesIO
+from PIL import Image
+
+# Browsers show frames without (or with a tiny) delay for 100ms, the converted animation keeps their speed
+MIN_FRAME_DURATION = 20
+DEFAULT_FRAME_DURATION = 100
+
+class Lazy_Frame:
+    """Stands in for a single frame of the source in the `append_images` of the WebP encoder
+
+    The frame is only decoded (and scaled) once the encoder converts it, so at most a few frames are held in memory at once.
+    The mode "P" is never valid for the WebP encoder, which therefore always calls `convert`."""
+    n_frames = 1
+    mode = "P"
+    has_transparency_data = True
+
+    def __init__(self, source:Image.Image, index:int, size:tuple[int, int]):
+        self.__source = source
+        self.__index = index
+        self.size = size
+
+    def seek(self, frame:int):
+        pass
+
+    def tell(self) -> int:
+        return 0
+
+    def convert(self, mode:str = "RGBA") -> Image.Image:
+        """Decodes the frame, frames are requested in ascending order which keeps seeking in the source cheap"""
+        self.__source.seek(self.__index)
+        frame = self.__source.convert("RGBA")
+        if frame.size != self.size:
+            frame = frame.resize(self.size, Image.Resampling.LANCZOS)
+        return frame
+
+def read_frame_durations(source:Image.Image) -> list[int]:
+    """Returns the duration (in milliseconds) of every frame of the animation"""
+    durations = []
+    for index in range(source.n_frames):
+        source.seek(index)
+        # WebP only sets the duration of a frame, once it has been decoded
+        source.load()
+        duration = source.info.get("duration") or 0
+        durations.append(int(duration) if duration >= MIN_FRAME_DURATION else DEFAULT_FRAME_DURATION)
+    return durations
+
+def select_frames(durations:list[int], max_frames:int, max_duration:float, drop_frames:bool) -> list[tuple[int, int]]:
+    """Returns the index and duration of the frames to keep
+
+    Animations longer than `max_duration` seconds are cut off. With more than `max_frames` frames left,
+    evenly spaced frames are dropped (their time is added to the frame shown before them), or the animation is cut off if `drop_frames` is False"""
+    frames = []
+    total_duration = 0
+    for index, duration in enumerate(durations):
+        if total_duration >= max_duration * 1000:
+            break
+        frames.append((index, duration))
+        total_duration += duration
+
+    if len(frames) > max_frames:
+        if drop_frames:
+            step = -(-len(frames) // max_frames)
+            frames = [(frames[start][0], sum(duration for _, duration in frames[start:start + step])) for start in range(0, len(frames), step)]
+        else:
+            frames = frames[:max_frames]
+    return frames
+
+def encode_animation(source:Image.Image, frames:list[tuple[int, int]], quality:int, max_edge:int) -> bytes:
+    """Encodes the selected frames of the source as animated WebP, scaled to fit into `max_edge`"""
+    scale = min(1.0, max_edge / max(source.size))
+    size = (max(1, round(source.width * scale)), max(1, round(source.height * scale)))
+
+    first_frame = Lazy_Frame(source, frames[0][0], size).convert()
+    webp_buffer = BytesIO()
+    first_frame.save(
+        webp_buffer,
+        format = "WEBP",
+        save_all = True,
+        append_images = [Lazy_Frame(source, index, size) for index, _ in frames[1:]],
+        duration = [duration for _, duration in frames],
+        loop = source.info.get("loop", 0),
+        quality = quality
+    )
+    return webp_buffer.getvalue()
+
+def transcode_animation_to_webp(source:Image.Image, quality:int, max_edge:int, max_frames:int, max_duration:float, drop_frames:bool) -> bytes:
+    """Converts an animated image (GIF or WebP) into an animated WebP, frame by frame"""
+    frames = select_frames(read_frame_durations(source), max_frames, max_duration, drop_frames)
+    return encode_animation(source, frames, quality, max_edge)
+
+def fit_animation_to_budget(source:Image.Image, byte_budget:int, min_quality:int, max_attempts:int) -> bytes:
+    """Re-encodes an animated WebP at `min_quality`, reducing its resolution until it does not exceed the byte budget
+
+    Unlike still images, the quality is not searched, since every attempt encodes all frames again.
+    The durations are read from the animation once, and carried through every attempt."""
+    frames = list(enumerate(read_frame_durations(source)))
+    max_edge = max(source.size)
+    smallest = encode_animation(source, frames, min_quality, max_edge)
+    attempts = 1
+    while len(smallest) > byte_budget and attempts < max_attempts:
+        max_edge = max(1, int(max_edge * (byte_budget / len(smallest)) ** 0.5 * 0.9))
+        smallest = encode_animation(source, frames, min_quality, max_edge)
+        attempts += 1
+    return smallest
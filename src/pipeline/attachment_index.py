@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+class Uploaded_Attachment(NamedTuple):
+    channel_id:int
+    message_id:int
+    attachment_id:int
+
+class Attachment_Index:
+    """A persistent index of the images already uploaded to discord, stored in a sqlite database
+
+    Maps a converted image (submission, source url, quality and encoder settings) to the message and attachment holding it,
+    so posting the same submission again can link the existing attachment instead of uploading the bytes again."""
+    VERSION = "1.1"
+
+    def __init__(self, database_path:Path, max_entries:int = 100_000):
+        """Opens (or creates) the database at the given path, holding at most `max_entries` images"""
+        self.__database_path = Path(database_path)
+        self.__max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__logger = logging.getLogger("pipeline.attachment_index")
+
+        self.__database_path.parent.mkdir(parents = True, exist_ok = True)
+        # Queries run in the default executor, the lock serializes the access to the connection
+        self.__connection = sqlite3.connect(self.__database_path, check_same_thread = False)
+        with self.__connection:
+            self.__connection.execute("PRAGMA journal_mode = WAL")
+            # Entries of version 1.0 do not know the encoder settings of their images, they can not be linked anymore
+            columns = [column[1] for column in self.__connection.execute("PRAGMA table_info(attachments)")]
+            if columns and "encoder_settings" not in columns:
+                self.__connection.execute("DROP TABLE attachments")
+                self.__logger.info("Dropped the images indexed without their encoder settings")
+            self.__connection.execute("""
+                CREATE TABLE IF NOT EXISTS attachments (
+                    submission_id TEXT NOT NULL,
+                    image_url TEXT NOT NULL,
+                    quality INTEGER NOT NULL,
+                    encoder_settings TEXT NOT NULL,
+                    channel_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    attachment_id INTEGER NOT NULL,
+                    PRIMARY KEY (submission_id, image_url, quality, encoder_settings)
+                )""")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS attachments_message ON attachments (message_id)")
+        self.__logger.info("Opened index of %s uploaded images at '%s'", self.get_entry_count(), self.__database_path)
+
+    def __execute(self, query:str, parameters:tuple | list = (), many:bool = False) -> list[tuple]:
+        with self.__lock, self.__connection:
+            if many:
+                self.__connection.executemany(query, parameters)
+                return []
+            return self.__connection.execute(query, parameters).fetchall()
+
+    async def get(self, submission_id:str, image_urls:list[str], quality:int, encoder_settings:str) -> list[Uploaded_Attachment] | None:
+        """Returns the uploaded attachments of all images in the order of `image_urls`, or None if any of them has not been uploaded yet"""
+        rows = await asyncio.to_thread(
+            self.__execute,
+            f"SELECT image_url, channel_id, message_id, attachment_id FROM attachments WHERE submission_id = ? AND quality = ? AND encoder_settings = ? AND image_url IN ({', '.join('?' * len(image_urls))})",
+            (submission_id, quality, encoder_settings, *image_urls)
+        )
+        attachments = {image_url: Uploaded_Attachment(channel_id, message_id, attachment_id) for image_url, channel_id, message_id, attachment_id in rows}
+        if len(attachments) < len(set(image_urls)):
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        return [attachments[image_url] for image_url in image_urls]
+
+    async def put(self, submission_id:str, image_urls:list[str], quality:int, encoder_settings:str, channel_id:int, message_id:int, attachment_ids:list[int]):
+        """Records the attachments of a sent message, `attachment_ids` are in the order of `image_urls`"""
+        await asyncio.to_thread(
+            self.__execute,
+            "INSERT OR REPLACE INTO attachments VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(submission_id, image_url, quality, encoder_settings, channel_id, message_id, attachment_id) for image_url, attachment_id in zip(image_urls, attachment_ids)],
+            True
+        )
+        await asyncio.to_thread(self.__prune)
+
+    def __prune(self):
+        """Removes the oldest entries, once the index holds more than `max_entries` images"""
+        self.__execute(
+            "DELETE FROM attachments WHERE rowid IN (SELECT rowid FROM attachments ORDER BY rowid ASC LIMIT max(0, (SELECT count(*) FROM attachments) - ?))",
+            (self.__max_entries,)
+        )
+
+    async def forget_message(self, message_id:int):
+        """Removes all images of a message, after it turned out to be deleted"""
+        await asyncio.to_thread(self.__execute, "DELETE FROM attachments WHERE message_id = ?", (message_id,))
+        self.__logger.debug("Removed the images of the deleted message %s", message_id)
+
+    def close(self):
+        """Closes the database"""
+        with self.__lock:
+            self.__connection.close()
+
+    def set_max_entries(self, max_entries:int):
+        """Changes the maximum number of images at runtime, surplus entries are removed with the next upload"""
+        self.__max_entries = max_entries
+
+    def get_hits(self) -> int:
+        """Returns the number of posts whose images were all found in the index"""
+        return self.__hits
+
+    def get_misses(self) -> int:
+        """Returns the number of posts with at least one image not found in the index"""
+        return self.__misses
+
+    def get_entry_count(self) -> int:
+        """Returns the number of images currently indexed"""
+        return self.__execute("SELECT count(*) FROM attachments")[0][0]
@@ -0,0 +1,100 @@
+import aiohttp
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+from utils.metrics import MEDIA_BYTES_IN, POST_STAGE_SECONDS
+
+class DownloadTooLarge(Exception):
+    pass
+
+class Media_Downloader:
+    """Downloads media over a shared, long-lived `aiohttp.ClientSession`
+
+    The session (and its connection pool) is owned by the bot, the downloader only bounds how many requests a single batch may issue at once."""
+    VERSION = "1.2"
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, session:aiohttp.ClientSession, max_concurrent_downloads:int = 6, max_download_size:int = 50 * 1024 * 1024):
+        """Initializes the downloader with the session to use, the number of concurrent downloads per batch and the maximum size (in bytes) of a single download"""
+        self.__session = session
+        self.__max_concurrent_downloads = max(1, max_concurrent_downloads)
+        self.__max_download_size = max_download_size
+        self.__logger = logging.getLogger("pipeline.downloader")
+
+    @property
+    def max_concurrent_downloads(self) -> int:
+        return self.__max_concurrent_downloads
+
+    def set_limits(self, max_concurrent_downloads:int, max_download_size:int):
+        """Changes the limits at runtime, batches already started keep their number of concurrent downloads"""
+        self.__max_concurrent_downloads = max(1, max_concurrent_downloads)
+        self.__max_download_size = max_download_size
+
+    async def warm_up(self, urls:list[str], connections:int) -> int:
+        """Resolves the hosts of the urls and opens `connections` keep-alive connections to each of them, ahead of the first download
+
+        Returns the number of connections opened, the status of the responses does not matter"""
+        async def connect(url:str):
+            async with self.__session.head(url, allow_redirects = False) as response:
+                await response.read()
+
+        results = await asyncio.gather(*(connect(url) for url in urls for _ in range(connections)), return_exceptions = True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        return len(results) - len(errors)
+
+    async def download(self, url:str) -> bytearray:
+        """Downloads the resource at the given url and returns its content
+
+        Raises `DownloadTooLarge` as soon as the resource turns out to be larger than the maximum download size"""
+        with POST_STAGE_SECONDS.time(stage = "image_download"):
+            data = await self.__download(url)
+        MEDIA_BYTES_IN.inc(len(data))
+        return data
+
+    async def __download(self, url:str) -> bytearray:
+        async with self.__session.get(url) as response:
+            response.raise_for_status()
+            # Reject early, if the server announces the size
+            if response.content_length is not None and response.content_length > self.__max_download_size:
+                raise DownloadTooLarge(f"The media at {url} is larger than {self.__max_download_size} bytes")
+
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                data += chunk
+                if len(data) > self.__max_download_size:
+                    raise DownloadTooLarge(f"The media at {url} is larger than {self.__max_download_size} bytes")
+            # Returned without converting it to `bytes`, which would copy the whole buffer
+            return data
+
+    async def download_all(self, urls:list[str], on_downloaded:Callable[[int, bytearray], Awaitable[Any]]) -> list[Any]:
+        """Downloads all urls concurrently and passes each result to `on_downloaded` as soon as it arrived
+
+        The callback is awaited outside of the download slot, so processing one image does not block the next download.
+        At most twice as many downloads as there are slots wait for (or are in) the callback, which bounds the memory held by a batch independent of its size.
+        If one of the downloads (or callbacks) fails, the others are cancelled before the exception is raised.
+        The returned list contains the results of the callback in the same order as `urls`."""
+        semaphore = asyncio.Semaphore(self.__max_concurrent_downloads)
+        pending = asyncio.Semaphore(2 * self.__max_concurrent_downloads)
+
+        async def download_in_slot(url:str) -> bytearray:
+            async with semaphore:
+                data = await self.download(url)
+            self.__logger.debug("Downloaded %s bytes from %s", len(data), url)
+            return data
+
+        async def download_and_process(index:int, url:str):
+            async with pending:
+                # Passed on without keeping a reference, so the callback can free the download as soon as it has been processed
+                return await on_downloaded(index, await download_in_slot(url))
+
+        tasks = [asyncio.ensure_future(download_and_process(index, url)) for index, url in enumerate(urls)]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            # Stop the remaining downloads and conversions of a failed (or cancelled) batch, and wait until they are gone,
+            # so the caller can free the resources of the batch without anything still using them
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions = True)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import tempfile
+from io import BytesIO
+from typing import BinaryIO
+
+class BuffersClosed(Exception):
+    pass
+
+class Media_Buffer:
+    """Holds a single encoded image, either in memory or in a temporary file on disk"""
+
+    def __init__(self, size:int, data:bytes | None = None, file:BinaryIO | None = None):
+        self.size = size
+        self.__data = data
+        self.__file = file
+
+    def is_spilled(self) -> bool:
+        """Returns True, if the image has been written to disk"""
+        return self.__file is not None
+
+    def open(self) -> BinaryIO:
+        """Returns a file object positioned at the start of the image, files on disk are streamed from there by the upload"""
+        if self.__file is not None:
+            self.__file.seek(0)
+            return self.__file
+        return BytesIO(self.__data)
+
+    async def read(self) -> bytes:
+        """Returns the encoded image, reading it from disk if it has been spilled"""
+        if self.__file is not None:
+            return await asyncio.to_thread(self.__read_file)
+        return self.__data
+
+    def __read_file(self) -> bytes:
+        self.__file.seek(0)
+        return self.__file.read()
+
+    def close(self):
+        """Frees the memory (or removes the temporary file) holding the image"""
+        self.__data = None
+        if self.__file is not None:
+            self.__file.close()
+
+class Command_Buffers:
+    """The images (and downloads) a single command holds, accounted towards the `Memory_Budget` until released"""
+
+    def __init__(self, budget:"Memory_Budget"):
+        self.__budget = budget
+        self.__buffers:dict[int, Media_Buffer] = {}
+        self.__held_bytes = 0
+        self.__closed = False
+
+    def hold(self, size:int):
+        """Accounts a buffer of the given size (like a download), until the same size is released again
+
+        Raises `BuffersClosed` if the command already completed, its bytes are no longer accounted"""
+        if self.__closed:
+            raise BuffersClosed("The buffers of the command have already been closed")
+        self.__held_bytes += size
+        self.__budget._add(size)
+
+    def release(self, size:int):
+        """Removes a buffer passed to `hold` from the accounting, a no-op once closed (everything has been released by then)"""
+        if self.__closed:
+            return
+        self.__held_bytes -= size
+        self.__budget._add(-size)
+
+    async def store(self, data:bytes) -> Media_Buffer:
+        """Takes over an encoded image, which is written to disk if the bytes in flight exceed the spill threshold
+
+        Raises `BuffersClosed` if the command already completed"""
+        if self.__closed:
+            raise BuffersClosed("The buffers of the command have already been closed")
+        if self.__budget.should_spill(len(data)):
+            buffer = Media_Buffer(len(data), file = await self.__budget.spill(data))
+            if self.__closed:
+                # Closed while writing the file
+                buffer.close()
+                raise BuffersClosed("The buffers of the command have already been closed")
+        else:
+            buffer = Media_Buffer(len(data), data = data)
+            self.hold(buffer.size)
+        self.__buffers[id(buffer)] = buffer
+        return buffer
+
+    def discard(self, buffer:Media_Buffer):
+        """Frees the image before the command completed"""
+        if self.__buffers.pop(id(buffer), None) is None:
+            return
+        if not buffer.is_spilled():
+            self.release(buffer.size)
+        buffer.close()
+
+    def get_bytes_in_flight(self) -> int:
+        """Returns the number of bytes the command currently holds in memory"""
+        return self.__held_bytes
+
+    def close(self):
+        """Frees all images and buffers of the command, later calls to `hold` and `store` are rejected"""
+        for buffer in list(self.__buffers.values()):
+            self.discard(buffer)
+        if self.__held_bytes:
+            self.release(self.__held_bytes)
+        self.__closed = True
+
+class Memory_Budget:
+    """Tracks the bytes of media held in memory by all commands, and spills encoded images to disk above a threshold
+
+    Keeps the peak memory bound by the number of images processed at once, instead of the size of the galleries waiting for their upload."""
+    VERSION = "1.0"
+
+    def __init__(self, spill_threshold:int, spill_directory:str | None = None):
+        """Initializes the budget, images are written to `spill_directory` (the temporary directory of the system by default) once more than `spill_threshold` bytes are held"""
+        self.__spill_threshold = spill_threshold
+        self.__spill_directory = spill_directory or None
+        self.__bytes_in_flight = 0
+        self.__peak_bytes_in_flight = 0
+        self.__spilled_images = 0
+        self.__spilled_bytes = 0
+        self.__logger = logging.getLogger("pipeline.memory")
+
+    def track(self) -> Command_Buffers:
+        """Returns the buffers of a new command, which have to be closed once the command completed"""
+        return Command_Buffers(self)
+
+    def _add(self, size:int):
+        self.__bytes_in_flight += size
+        self.__peak_bytes_in_flight = max(self.__peak_bytes_in_flight, self.__bytes_in_flight)
+
+    def should_spill(self, size:int) -> bool:
+        """Returns True, if holding another `size` bytes in memory would exceed the spill threshold"""
+        return self.__bytes_in_flight + size > self.__spill_threshold
+
+    async def spill(self, data:bytes) -> BinaryIO:
+        """Writes the image to an anonymous temporary file, which is removed once closed"""
+        file = await asyncio.to_thread(self.__write, data)
+        self.__spilled_images += 1
+        self.__spilled_bytes += len(data)
+        self.__logger.debug("Spilled %s bytes to disk, %s bytes in flight", len(data), self.__bytes_in_flight)
+        return file
+
+    def __write(self, data:bytes) -> BinaryIO:
+        file = tempfile.TemporaryFile(dir = self.__spill_directory)
+        file.write(data)
+        return file
+
+    def set_spill_threshold(self, spill_threshold:int):
+        """Changes the threshold at runtime, images already stored stay where they are"""
+        self.__spill_threshold = spill_threshold
+
+    def get_bytes_in_flight(self) -> int:
+        """Returns the number of bytes currently held in memory by all commands"""
+        return self.__bytes_in_flight
+
+    def get_peak_bytes_in_flight(self) -> int:
+        """Returns the largest number of bytes held in memory at once"""
+        return self.__peak_bytes_in_flight
+
+    def get_spilled_images(self) -> int:
+        """Returns the number of images written to disk"""
+        return self.__spilled_images
+
+    def get_spilled_bytes(self) -> int:
+        """Returns the number of bytes written to disk"""
+        return self.__spilled_bytes
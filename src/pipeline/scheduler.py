@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Hashable
+
+class SchedulerBusy(Exception):
+    pass
+
+class Job_Ticket:
+    """The place of a single job in the queue of the `Job_Scheduler`"""
+
+    def __init__(self, scheduler:"Job_Scheduler", guild_key:Hashable, user_id:int):
+        self.guild_key = guild_key
+        self.user_id = user_id
+        self.admitted = asyncio.get_running_loop().create_future()
+        self.__scheduler = scheduler
+        self.__released = False
+
+    def get_position(self) -> int:
+        """Returns the position in the queue (starting at 1), 0 once the job is running"""
+        if self.admitted.done():
+            return 0
+        return self.__scheduler.get_position(self)
+
+    async def acquire(self, on_position:Callable[[int], Awaitable[None] | None] = None, interval:float = 2):
+        """Waits until the job may run, reporting the position in the queue every `interval` seconds to `on_position`"""
+        while not self.admitted.done():
+            if on_position is not None:
+                result = on_position(self.get_position())
+                if asyncio.iscoroutine(result):
+                    await result
+            try:
+                await asyncio.wait_for(asyncio.shield(self.admitted), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self):
+        """Frees the slot of the job (or its place in the queue), may be called more than once"""
+        if not self.__released:
+            self.__released = True
+            self.__scheduler.release(self)
+
+class Job_Scheduler:
+    """Limits the number of jobs running at once and queues the remaining ones
+
+    Queued jobs are admitted round-robin across guilds and, within a guild, round-robin across users.
+    A burst of jobs from a single guild or user therefore does not delay the jobs of everyone else."""
+    VERSION = "1.0"
+
+    def __init__(self, max_concurrent_jobs:int = 4, max_queue_length:int = 50):
+        """Initializes the scheduler with the number of jobs allowed to run at once and the maximum number of waiting jobs"""
+        self.__max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.__max_queue_length = max_queue_length
+        # Guilds (and within them users) in the order they are served next
+        self.__queues:OrderedDict[Hashable, OrderedDict[int, deque[Job_Ticket]]] = OrderedDict()
+        self.__queued_jobs = 0
+        self.__running_jobs = 0
+        self.__rejected_jobs = 0
+        self.__logger = logging.getLogger("pipeline.scheduler")
+
+    def submit(self, guild_id:int | None, user_id:int) -> Job_Ticket:
+        """Enqueues a job and returns its ticket, raises `SchedulerBusy` if the queue is full"""
+        # Direct messages have no guild, every user is treated as a guild of their own
+        guild_key = guild_id if guild_id is not None else f"user:{user_id}"
+        ticket = Job_Ticket(self, guild_key, user_id)
+
+        if self.__running_jobs < self.__max_concurrent_jobs and self.__queued_jobs == 0:
+            self.__running_jobs += 1
+            ticket.admitted.set_result(None)
+            return ticket
+
+        if self.__queued_jobs >= self.__max_queue_length:
+            self.__rejected_jobs += 1
+            self.__logger.warning("Rejected job of user %s in %s, %s jobs are already queued", user_id, guild_key, self.__queued_jobs)
+            raise SchedulerBusy(f"{self.__queued_jobs} jobs are already waiting")
+
+        self.__queues.setdefault(guild_key, OrderedDict()).setdefault(user_id, deque()).append(ticket)
+        self.__queued_jobs += 1
+        return ticket
+
+    def release(self, ticket:Job_Ticket):
+        """Frees the slot of a running ticket or removes a waiting one from the queue"""
+        if ticket.admitted.done():
+            self.__running_jobs -= 1
+        else:
+            ticket.admitted.cancel()
+            self.__remove(ticket)
+        self.__dispatch()
+
+    def __remove(self, ticket:Job_Ticket):
+        users = self.__queues[ticket.guild_key]
+        users[ticket.user_id].remove(ticket)
+        self.__queued_jobs -= 1
+        if not users[ticket.user_id]:
+            del users[ticket.user_id]
+        if not users:
+            del self.__queues[ticket.guild_key]
+
+    def __next_ticket(self) -> Job_Ticket:
+        """Takes the next ticket, then moves its user and guild to the end of the line"""
+        guild_key, users = next(iter(self.__queues.items()))
+        user_id, tickets = next(iter(users.items()))
+        ticket = tickets.popleft()
+        self.__queued_jobs -= 1
+
+        if tickets:
+            users.move_to_end(user_id)
+        else:
+            del users[user_id]
+        if users:
+            self.__queues.move_to_end(guild_key)
+        else:
+            del self.__queues[guild_key]
+        return ticket
+
+    def __dispatch(self):
+        while self.__running_jobs < self.__max_concurrent_jobs and self.__queued_jobs:
+            self.__running_jobs += 1
+            self.__next_ticket().admitted.set_result(None)
+
+    def get_position(self, ticket:Job_Ticket) -> int:
+        """Returns the position (starting at 1) of a waiting ticket, by replaying the round-robin order"""
+        guilds = deque(deque(deque(tickets) for tickets in users.values()) for users in self.__queues.values())
+        position = 0
+        while guilds:
+            users = guilds.popleft()
+            tickets = users.popleft()
+            position += 1
+            if tickets.popleft() is ticket:
+                return position
+            if tickets:
+                users.append(tickets)
+            if users:
+                guilds.append(users)
+        return 0
+
+    def set_limits(self, max_concurrent_jobs:int, max_queue_length:int):
+        """Changes the limits at runtime, running jobs are not affected by a lower limit"""
+        self.__max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.__max_queue_length = max_queue_length
+        self.__dispatch()
+
+    def get_running_jobs(self) -> int:
+        """Returns the number of jobs currently running"""
+        return self.__running_jobs
+
+    def get_queued_jobs(self) -> int:
+        """Returns the number of jobs waiting for a free slot"""
+        return self.__queued_jobs
+
+    def get_rejected_jobs(self) -> int:
+        """Returns the number of jobs rejected, because the queue was full"""
+        return self.__rejected_jobs
+
+    def get_max_concurrent_jobs(self) -> int:
+        """Returns the number of jobs allowed to run at once"""
+        return self.__max_concurrent_jobs
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+
+class Transcode_Cache:
+    """A size bounded, content addressed on-disk store for transcoded images
+
+    Entries are addressed by a hash of the source url and the encoder settings used to produce them.
+    An in-memory index keeps track of the entries in least recently used order, which is restored from the modification times after a restart."""
+    VERSION = "1.0"
+    FILE_SUFFIX = ".webp"
+
+    def __init__(self, directory:Path, max_size:int):
+        """Initializes the cache in the given directory, holding at most `max_size` bytes"""
+        self.__directory = Path(directory)
+        self.__max_size = max_size
+        self.__index:OrderedDict[str, int] = OrderedDict()
+        # Keys currently being written, concurrent puts of the same image are skipped
+        self.__writing:set[str] = set()
+        self.__current_size = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__logger = logging.getLogger("pipeline.cache")
+
+        self.__directory.mkdir(parents = True, exist_ok = True)
+        self.__load_index()
+
+    def __load_index(self):
+        """Restores the index from the files present in the cache directory, oldest entries first"""
+        entries = []
+        for file_path in self.__directory.glob(f"*/*{self.FILE_SUFFIX}"):
+            stat = file_path.stat()
+            entries.append((stat.st_mtime, file_path.stem, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self.__index[key] = size
+            self.__current_size += size
+        self.__evict()
+        self.__logger.info("Loaded %s cached images (%s bytes) from '%s'", len(self.__index), self.__current_size, self.__directory)
+
+    @staticmethod
+    def make_key(source_url:str, quality:int, encoder_settings:str) -> str:
+        """Returns the key, an image converted from `source_url` with the given settings is stored under"""
+        return hashlib.sha256(f"{source_url}|{quality}|{encoder_settings}".encode()).hexdigest()
+
+    def __get_path(self, key:str) -> Path:
+        return self.__directory / key[:2] / f"{key}{self.FILE_SUFFIX}"
+
+    async def get(self, key:str) -> bytes | None:
+        """Returns the cached image stored under the key, or None if there is no such entry"""
+        if key not in self.__index:
+            self.__misses += 1
+            return None
+
+        self.__index.move_to_end(key)
+        try:
+            data = await asyncio.to_thread(self.__read, self.__get_path(key))
+        except FileNotFoundError:
+            # Evicted (or removed by hand) while waiting for the read
+            self.__forget(key)
+            self.__misses += 1
+            return None
+
+        self.__hits += 1
+        return data
+
+    @staticmethod
+    def __read(path:Path) -> bytes:
+        data = path.read_bytes()
+        # Keep the recency on disk, so the order survives a restart
+        os.utime(path)
+        return data
+
+    async def put(self, key:str, data:bytes):
+        """Stores the image under the key, evicting the least recently used entries if the cache grew too large"""
+        if len(data) > self.__max_size or key in self.__index or key in self.__writing:
+            return
+
+        self.__writing.add(key)
+        try:
+            await asyncio.to_thread(self.__write, self.__get_path(key), data)
+        finally:
+            self.__writing.discard(key)
+        self.__index[key] = len(data)
+        self.__current_size += len(data)
+        self.__evict()
+
+    @staticmethod
+    def __write(path:Path, data:bytes):
+        path.parent.mkdir(exist_ok = True)
+        # A file of its own, other processes of the launcher may write the same image into the shared directory at once
+        file_descriptor, temporary_path = tempfile.mkstemp(suffix = ".tmp", dir = path.parent)
+        try:
+            with os.fdopen(file_descriptor, "wb") as temporary_file:
+                temporary_file.write(data)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def __forget(self, key:str):
+        size = self.__index.pop(key, None)
+        if size is not None:
+            self.__current_size -= size
+
+    def __evict(self):
+        """Removes the least recently used entries until the cache fits into its size limit"""
+        while self.__current_size > self.__max_size and self.__index:
+            key, _ = next(iter(self.__index.items()))
+            self.__forget(key)
+            try:
+                self.__get_path(key).unlink()
+            except FileNotFoundError:
+                pass
+            self.__logger.debug("Evicted cached image %s", key)
+
+    def set_max_size(self, max_size:int):
+        """Changes the size limit at runtime, evicting entries if the cache no longer fits"""
+        self.__max_size = max_size
+        self.__evict()
+
+    def get_hits(self) -> int:
+        """Returns the number of lookups that were answered from the cache"""
+        return self.__hits
+
+    def get_misses(self) -> int:
+        """Returns the number of lookups that had no matching entry"""
+        return self.__misses
+
+    def get_entry_count(self) -> int:
+        """Returns the number of images currently stored"""
+        return len(self.__index)
+
+    def get_size(self) -> int:
+        """Returns the number of bytes currently stored"""
+        return self.__current_size
+
+    def get_max_size(self) -> int:
+        """Returns the maximum number of bytes the cache may hold"""
+        return self.__max_size
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable
+from utils.metrics import POST_STAGE_SECONDS
+from pipeline.animation import fit_animation_to_budget, transcode_animation_to_webp
+import PIL
+from PIL import Image
+
+class TranscodeTimeout(Exception):
+    pass
+
+def encode_webp(image:Image.Image, quality:int) -> bytes:
+    """Encodes an already decoded image as WebP"""
+    webp_buffer = BytesIO()
+    image.save(webp_buffer, format = "WEBP", quality = quality)
+    return webp_buffer.getvalue()
+
+def configure_worker(max_image_pixels:int):
+    """Executed once in every worker process, before it receives its first job"""
+    # Pillow only warns about images above the limit, and raises an `Image.DecompressionBombError` above twice of it.
+    # Turning the warning into an error rejects every image above the limit, before it is decoded
+    Image.MAX_IMAGE_PIXELS = max_image_pixels
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+def warm_up_worker() -> int:
+    """Encodes and decodes a tiny image in every supported format, so the first real job does not pay for loading the codecs
+
+    Returns the id of the worker process, which executed the job"""
+    image = Image.new("RGB", (16, 16))
+    for image_format in ("WEBP", "JPEG", "PNG", "GIF"):
+        buffer = BytesIO()
+        image.save(buffer, format = image_format)
+        with Image.open(BytesIO(buffer.getvalue())) as decoded_image:
+            decoded_image.load()
+    return os.getpid()
+
+def transcode_to_webp(image_data:bytes, quality:int, max_edge:int, animation_limits:tuple[int, float, int, bool] = (300, 60, 720, True)) -> bytes:
+    """Decodes the given image and encodes it as WebP, executed inside of the worker processes
+
+    Images with an edge longer than `max_edge` are downscaled, JPEGs are already decoded at a reduced resolution if possible.
+    Animations are converted frame by frame into an animated WebP, bounded by the `animation_limits` (frames, duration, edge and whether to drop frames)"""
+    with Image.open(BytesIO(image_data)) as original_image:
+        if getattr(original_image, "is_animated", False):
+            max_frames, max_duration, max_animation_edge, drop_frames = animation_limits
+            return transcode_animation_to_webp(original_image, quality, min(max_edge, max_animation_edge), max_frames, max_duration, drop_frames)
+        if max(original_image.size) > max_edge:
+            # Lets the JPEG decoder scale by 1/2, 1/4 or 1/8 while decoding, no-op for other formats
+            original_image.draft(None, (max_edge, max_edge))
+            original_image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS, reducing_gap = 2.0)
+        return encode_webp(original_image, quality)
+
+def fit_webp_to_budget(image_data:bytes, quality:int, byte_budget:int, min_quality:int, max_attempts:int) -> bytes:
+    """Re-encodes the image (already encoded with `quality`) as WebP, at the highest quality that does not exceed the byte budget
+
+    The quality is searched between `min_quality` and `quality`, if even the lowest quality is too large, the image is downscaled.
+    The number of encoding attempts is limited by `max_attempts`, if no attempt fits the budget the smallest result is returned."""
+    if len(image_data) <= byte_budget:
+        return image_data
+
+    with Image.open(BytesIO(image_data)) as original_image:
+        if getattr(original_image, "is_animated", False):
+            return fit_animation_to_budget(original_image, byte_budget, min_quality, max_attempts)
+        original_image.load()
+        # Not worth searching, if even the lowest quality does not fit
+        best_fit = encode_webp(original_image, min_quality)
+        attempts = 1
+        if len(best_fit) <= byte_budget:
+            # Binary search for the highest quality that fits
+            lower, upper = min_quality + 1, quality - 1
+            while lower <= upper and attempts < max_attempts:
+                current_quality = (lower + upper) // 2
+                encoded = encode_webp(original_image, current_quality)
+                attempts += 1
+                if len(encoded) <= byte_budget:
+                    best_fit = encoded
+                    lower = current_quality + 1
+                else:
+                    upper = current_quality - 1
+            return best_fit
+
+        # Not even the lowest quality fits, reduce the resolution proportional to the overshoot
+        smallest = best_fit
+        image = original_image
+        while attempts < max_attempts:
+            scale = (byte_budget / len(smallest)) ** 0.5 * 0.9
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+            smallest = encode_webp(image, min_quality)
+            attempts += 1
+            if len(smallest) <= byte_budget:
+                break
+        return smallest
+
+class Transcode_Engine:
+    """Runs the CPU heavy decoding and encoding of images in a pool of worker processes,
+
+    to keep the event loop (and therefore the gateway connection) responsive while galleries are converted."""
+    VERSION = "1.0"
+    # Identifies the produced output, changes to the encoding have to be reflected here to invalidate cached results
+    ENCODER_SETTINGS = f"webp;pillow={PIL.__version__}"
+
+    def __init__(self, max_workers:int = 2, job_timeout:float = 60, min_quality:int = 40, max_fit_attempts:int = 6, max_edge:int = 4096, max_image_pixels:int = 100_000_000, animation_limits:tuple[int, float, int, bool] = (300, 60, 720, True)):
+        """Initializes the engine with the number of worker processes and the timeout (in seconds) per job
+
+        `min_quality` and `max_fit_attempts` bound the search, when images have to be fitted into an upload budget.
+        `max_edge` is the longest edge (in pixels) of converted images, images with more than `max_image_pixels` pixels are rejected.
+        `animation_limits` holds the maximum number of frames, duration (in seconds) and edge of animations and whether frames are dropped to stay within them"""
+        self.__animation_limits = tuple(animation_limits)
+        self.__max_workers = max(1, max_workers)
+        self.__job_timeout = job_timeout
+        self.__min_quality = min_quality
+        self.__max_fit_attempts = max(1, max_fit_attempts)
+        self.__max_edge = max_edge
+        # The workers are started lazily, after the bot already runs threads (which must not be forked).
+        # They are forked from a single threaded server instead, which imports the entrypoint and the codecs once for all of them
+        mp_context = multiprocessing.get_context("forkserver")
+        mp_context.set_forkserver_preload(["__main__", __name__])
+        self.__executor = ProcessPoolExecutor(
+            max_workers = self.__max_workers,
+            mp_context = mp_context,
+            initializer = configure_worker,
+            initargs = (max_image_pixels,)
+        )
+        # Jobs are only submitted to the pool once a worker is free, the timeout of a job does not include waiting for one
+        self.__free_workers = asyncio.Semaphore(self.__max_workers)
+        self.__pending_jobs = 0
+        self.__total_jobs = 0
+        self.__timed_out_jobs = 0
+        self.__logger = logging.getLogger("pipeline.transcoder")
+
+    async def transcode(self, image_data:bytes, quality:int) -> bytes:
+        """Converts the given image into WebP with the specified quality and returns the encoded bytes
+
+        Raises `TranscodeTimeout` if the job did not finish within the job timeout"""
+        return await self.__run("transcode", transcode_to_webp, image_data, quality, self.__max_edge, self.__animation_limits)
+
+    async def fit_gallery(self, images:list[bytes], quality:int, byte_budget:int) -> list[bytes]:
+        """Re-encodes the images, so that their combined size does not exceed the byte budget
+
+        Each image receives a share of the budget proportional to its current size, images are processed concurrently.
+        Raises `TranscodeTimeout` if one of the jobs did not finish within the job timeout"""
+        total_size = sum(len(image_data) for image_data in images)
+        if total_size <= byte_budget:
+            return images
+
+        self.__logger.debug("Fitting %s images (%s bytes) into a budget of %s bytes", len(images), total_size, byte_budget)
+        return await asyncio.gather(*(
+            self.__run("upload_fit", fit_webp_to_budget, image_data, quality, int(byte_budget * len(image_data) / total_size), self.__min_quality, self.__max_fit_attempts)
+            for image_data in images
+        ))
+
+    async def __run(self, stage:str, function:Callable, image_data:bytes, *args):
+        """Waits for a free worker, then runs the function on it and waits for its result, bounded by the job timeout
+
+        The timeout only starts once the job has been handed to its worker, so a long queue does not let quick jobs time out.
+        The time until the result arrived (including the time spent waiting for a worker) is recorded for the given stage"""
+        loop = asyncio.get_running_loop()
+        self.__pending_jobs += 1
+        self.__total_jobs += 1
+        with POST_STAGE_SECONDS.time(stage = stage):
+            try:
+                await self.__free_workers.acquire()
+            except BaseException:
+                self.__pending_jobs -= 1
+                raise
+            try:
+                future:Future = self.__executor.submit(function, image_data, *args)
+            except BaseException:
+                self.__job_done()
+                raise
+            # The worker is only free again once the job finished, even after a timeout. The callback runs on a thread of the executor
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.__job_done))
+
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), self.__job_timeout)
+            except asyncio.TimeoutError:
+                # A running job can not be cancelled, it occupies its worker until it finished
+                self.__timed_out_jobs += 1
+                self.__logger.warning("Transcoding job did not finish within %ss (%s bytes of input)", self.__job_timeout, len(image_data))
+                raise TranscodeTimeout(f"Converting the image took longer than {self.__job_timeout} seconds")
+
+    async def warm_up(self) -> int:
+        """Starts the worker processes and loads the codecs inside of them, returns the number of workers that executed a warm-up job"""
+        # The pool starts a new worker for each job submitted while no worker is idle
+        futures = [asyncio.wrap_future(self.__executor.submit(warm_up_worker)) for _ in range(self.__max_workers)]
+        return len(set(await asyncio.wait_for(asyncio.gather(*futures), self.__job_timeout)))
+
+    def __job_done(self):
+        self.__pending_jobs -= 1
+        self.__free_workers.release()
+
+    def update_settings(self, job_timeout:float, min_quality:int, max_fit_attempts:int, max_edge:int):
+        """Changes the settings at runtime, jobs already submitted keep the settings they were submitted with
+
+        The number of workers and the pixel limit are fixed for the lifetime of the pool."""
+        self.__job_timeout = job_timeout
+        self.__min_quality = min_quality
+        self.__max_fit_attempts = max_fit_attempts
+        self.__max_edge = max_edge
+
+    def update_animation_limits(self, animation_limits:tuple[int, float, int, bool]):
+        """Changes the limits of animations at runtime, jobs already submitted keep the limits they were submitted with"""
+        self.__animation_limits = tuple(animation_limits)
+
+    def get_encoder_settings(self) -> str:
+        """Returns a string identifying the settings, images are currently encoded with"""
+        return f"{self.ENCODER_SETTINGS};max_edge={self.__max_edge};animation={','.join(map(str, self.__animation_limits))}"
+
+    def get_worker_count(self) -> int:
+        """Returns the number of worker processes of the pool"""
+        return self.__max_workers
+
+    def get_pending_jobs(self) -> int:
+        """Returns the number of jobs, that are either queued or currently being processed"""
+        return self.__pending_jobs
+
+    def get_queue_depth(self) -> int:
+        """Returns the number of jobs waiting for a free worker"""
+        return max(0, self.__pending_jobs - self.__max_workers)
+
+    def get_total_jobs(self) -> int:
+        """Returns the total number of jobs submitted since the creation of the engine"""
+        return self.__total_jobs
+
+    def get_timed_out_jobs(self) -> int:
+        """Returns the number of jobs that exceeded the job timeout"""
+        return self.__timed_out_jobs
+
+    def shutdown(self):
+        """Stops the worker processes, jobs not yet started are cancelled"""
+        self.__executor.shutdown(wait = True, cancel_futures = True)
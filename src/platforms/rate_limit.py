@@ -0,0 +1,50 @@
+from time import monotonic
+from typing import Any, Mapping
+import asyncprawcore
+
+class Rate_Limit_Tracker:
+    """Keeps track of the rate limit budget reported by the `X-Ratelimit-*` headers of the responses
+
+    Pacing the requests is left to the rate limiter of asyncprawcore, the tracker only makes the budget observable."""
+
+    def __init__(self):
+        self.__remaining:float | None = None
+        self.__used = 0
+        self.__reset_at = 0.0
+
+    def update(self, headers:Mapping[str, str]):
+        """Takes over the budget reported by the response headers"""
+        if "x-ratelimit-remaining" not in headers:
+            return
+        self.__remaining = float(headers["x-ratelimit-remaining"])
+        self.__used = int(float(headers.get("x-ratelimit-used", 0)))
+        self.__reset_at = monotonic() + float(headers["x-ratelimit-reset"])
+
+    def get_remaining(self) -> float | None:
+        """Returns the number of requests left in the current window, None if unknown"""
+        if self.__remaining is None or monotonic() >= self.__reset_at:
+            return None
+        return self.__remaining
+
+    def get_seconds_until_reset(self) -> float:
+        """Returns the number of seconds until the current window ends"""
+        return max(0.0, self.__reset_at - monotonic())
+
+    def get_used(self) -> int:
+        """Returns the number of requests used in the current window, as reported by reddit"""
+        return self.__used
+
+class Tracking_Requestor(asyncprawcore.Requestor):
+    """Requestor passing the headers of each response from the api to the `Rate_Limit_Tracker`"""
+
+    def __init__(self, *args:Any, tracker:Rate_Limit_Tracker, **kwargs:Any):
+        super().__init__(*args, **kwargs)
+        self.tracker = tracker
+
+    async def request(self, *args:Any, timeout:float | None = None, **kwargs:Any):
+        response = await super().request(*args, timeout = timeout, **kwargs)
+        # Requests for an access token do not count towards the budget
+        url = args[1] if len(args) > 1 else kwargs.get("url", "")
+        if str(url).startswith(self.oauth_url):
+            self.tracker.update(response.headers)
+        return response
@@ -1,37 +1,195 @@
+import asyncio
 import asyncpraw
 import asyncpraw.models
+from asyncpraw.exceptions import InvalidURL
 import logging
+from platforms.rate_limit import Rate_Limit_Tracker, Tracking_Requestor
 from utils.event_counter import Event_Counter
+from utils.ttl_cache import TTL_Cache
 from utils.datetime_tools import get_elapsed_time_milliseconds
 from datetime import datetime
 
+class SubmissionNotFound(Exception):
+    pass
+
 class Reddit_Adapter(asyncpraw.Reddit):
     """A class that extends and abstracts the functionality of the `asyncpraw.Reddit` class by adding 
-    logging and request tracking capabilities."""
-    VERSION = "1.0"
+    logging, request tracking and caching capabilities."""
+    VERSION = "1.4"
+    PLATFORM_NAME = "Reddit"
+    HOSTNAMES = ("reddit.com",)
+    # Short links of posts, the subdomains (like `i.` and `v.`) host the media of the posts instead
+    EXACT_HOSTNAMES = ("redd.it",)
+    SUPPORTED_IMAGE_EXTENSIONS = ("jpg", "jpeg", "png", "webp", "heic", "heif", "gif")
+    # Maximum number of submissions the info endpoint returns per request
+    BATCH_SIZE = 100
     number_of_instances = 0
 
-    def __init__(self, client_id:str, client_secret:str):
-        """Initializes the Reddit Adapter, while stating credentials for the login to the reddit api"""
+    def __init__(self, client_id:str, client_secret:str, cache_ttl:float = 300, cache_size:int = 512, media_base_url:str = "https://i.redd.it", **reddit_settings):
+        """Initializes the Reddit Adapter, while stating credentials for the login to the reddit api
+        
+        Fetched submissions are cached for `cache_ttl` seconds, holding at most `cache_size` submissions at once.
+        Images of galleries are downloaded from `media_base_url`, additional settings are passed on to `asyncpraw.Reddit`"""
         self.__instance_number = self.__class__.number_of_instances
         self.__class__.number_of_instances += 1
+        self.__rate_limit = Rate_Limit_Tracker()
         
         super().__init__(
             client_id = client_id,
             client_secret = client_secret,
-            user_agent="Small discord bot to embed posts (given by url) into an standardized format"
+            user_agent="Small discord bot to embed posts (given by url) into an standardized format",
+            requestor_class = Tracking_Requestor,
+            requestor_kwargs = {**reddit_settings.pop("requestor_kwargs", {}), "tracker": self.__rate_limit},
+            **reddit_settings
         )
-        self.__events = Event_Counter(1000)
+        self.__media_base_url = media_base_url
+        self.__events = Event_Counter(1000, windows = ("5m", "10m", "15m"))
+        self.__cache_hits = Event_Counter(1000, windows = ("5m", "10m", "15m"))
+        self.__cache = TTL_Cache(cache_ttl, cache_size)
+        self.__in_flight:dict[str, asyncio.Future] = {}
         self.__logger = logging.getLogger(f"pltfm.reddit.{self.__instance_number}")
 
     async def fetch(self, post_url:str) -> asyncpraw.models.Submission:
-        """Fetches specified submission (post) and returns it"""
+        """Fetches specified submission (post) and returns it
+
+        Submissions are served from the cache while valid, concurrent fetches of the same submission share a single request"""
         start_time = datetime.now().timestamp()
-        self.__events.increment()
-        subm = await self.submission(url = post_url)
-        self.__logger.debug(f"Submission for post (URL: {post_url}), successfully fetched after {get_elapsed_time_milliseconds(datetime.now().timestamp() - start_time)}")
+        # Raises `InvalidURL` for urls not naming a submission, like share links (/r/.../s/...)
+        cache_key = asyncpraw.models.Submission.id_from_url(post_url)
+
+        subm = self.__cache.get(cache_key)
+        if subm is not None:
+            self.__cache_hits.increment()
+            self.__logger.debug("Submission for post (URL: %s), served from cache", post_url)
+            return subm
+
+        # Join an already running request for the same submission
+        in_flight = self.__in_flight.get(cache_key)
+        if in_flight is not None:
+            self.__cache_hits.increment()
+            subm = await asyncio.shield(in_flight)
+            self.__logger.debug("Submission for post (URL: %s), received from concurrent request after %s", post_url, get_elapsed_time_milliseconds(datetime.now().timestamp() - start_time))
+            return subm
+
+        in_flight = asyncio.get_running_loop().create_future()
+        self.__in_flight[cache_key] = in_flight
+        try:
+            self.__events.increment()
+            subm = await self.submission(cache_key)
+        except asyncio.CancelledError:
+            in_flight.cancel()
+            raise
+        except Exception as error:
+            in_flight.set_exception(error)
+            # Only retrieved, to prevent the warning about a never retrieved exception if nobody joined the request
+            in_flight.exception()
+            raise
+        else:
+            in_flight.set_result(subm)
+        finally:
+            del self.__in_flight[cache_key]
+
+        self.__cache.set(cache_key, subm)
+        self.__logger.debug("Submission for post (URL: %s), successfully fetched after %s", post_url, get_elapsed_time_milliseconds(datetime.now().timestamp() - start_time))
         return subm
     
+    async def fetch_many(self, post_urls:list[str]) -> list[asyncpraw.models.Submission | Exception]:
+        """Fetches multiple submissions at once and returns them in the order of the urls
+
+        Submissions not cached are requested in batches of up to `BATCH_SIZE` through the info endpoint.
+        The result for each url is either the submission or the exception raised while fetching it"""
+        start_time = datetime.now().timestamp()
+        results:list[asyncpraw.models.Submission | Exception | None] = [None] * len(post_urls)
+        batched:dict[str, list[int]] = {}
+        joined:dict[int, asyncio.Future] = {}
+        for index, post_url in enumerate(post_urls):
+            try:
+                submission_id = asyncpraw.models.Submission.id_from_url(post_url)
+            except InvalidURL as error:
+                results[index] = error
+                continue
+
+            subm = self.__cache.get(submission_id)
+            if subm is not None:
+                self.__cache_hits.increment()
+                results[index] = subm
+            elif submission_id in self.__in_flight:
+                self.__cache_hits.increment()
+                joined[index] = self.__in_flight[submission_id]
+            else:
+                batched.setdefault(submission_id, []).append(index)
+
+        # Concurrent fetches of the same submissions join the batch, like they would join a single request
+        submission_ids = list(batched)
+        in_flight = {submission_id: asyncio.get_running_loop().create_future() for submission_id in submission_ids}
+        self.__in_flight.update(in_flight)
+        try:
+            fetched:dict[str, asyncpraw.models.Submission] = {}
+            for offset in range(0, len(submission_ids), self.BATCH_SIZE):
+                self.__events.increment()
+                async for subm in self.info(fullnames = [f"t3_{submission_id}" for submission_id in submission_ids[offset:offset + self.BATCH_SIZE]]):
+                    fetched[subm.id] = subm
+        except asyncio.CancelledError:
+            for future in in_flight.values():
+                future.cancel()
+            raise
+        except Exception as error:
+            for submission_id, future in in_flight.items():
+                future.set_exception(error)
+                future.exception()
+                for index in batched[submission_id]:
+                    results[index] = error
+        else:
+            for submission_id, future in in_flight.items():
+                subm = fetched.get(submission_id)
+                if subm is None:
+                    # Deleted and removed submissions are left out by reddit
+                    error = SubmissionNotFound(f"The submission {submission_id} does not exist (anymore)")
+                    future.set_exception(error)
+                    future.exception()
+                else:
+                    self.__cache.set(submission_id, subm)
+                    future.set_result(subm)
+                for index in batched[submission_id]:
+                    results[index] = subm if subm is not None else error
+        finally:
+            for submission_id in submission_ids:
+                del self.__in_flight[submission_id]
+
+        # Submissions requested by someone else in the meantime
+        if joined:
+            for index, result in zip(joined, await asyncio.gather(*(asyncio.shield(future) for future in joined.values()), return_exceptions = True)):
+                results[index] = result
+
+        self.__logger.debug("Fetched %s submissions with %s batched requests after %s", len(post_urls), -(-len(submission_ids) // self.BATCH_SIZE), get_elapsed_time_milliseconds(datetime.now().timestamp() - start_time))
+        return results
+
+    async def warm_up(self):
+        """Requests the access token ahead of the first fetch, which would otherwise have to wait for it"""
+        await self.auth.scopes()
+
+    def get_media_base_url(self) -> str:
+        """Returns the url, images of galleries are downloaded from"""
+        return self.__media_base_url
+
+    def get_image_urls(self, subm:asyncpraw.models.Submission) -> list[str]:
+        """Returns the urls of all images (in a supported format) of the submission, in the order of the gallery"""
+        image_urls = []
+        # Check if submission has a gallery
+        if hasattr(subm, "media_metadata"):
+            for media_id, media in subm.media_metadata.items():
+                file_extension = media["m"].split("/")[1]
+                if file_extension not in self.SUPPORTED_IMAGE_EXTENSIONS:
+                    continue
+                image_urls.append(f"{self.__media_base_url}/{media_id}.{file_extension}")
+        else:
+            image_urls.append(subm.url)
+        return image_urls
+    
+    def get_rate_limit(self) -> Rate_Limit_Tracker:
+        """Returns the rate limit budget, as reported by the responses of the api"""
+        return self.__rate_limit
+
     def get_total_requests(self) -> int:
         """Returns the total number of requests made since the creation of the adapter"""
         return self.__events.get_total_events()
@@ -42,4 +200,12 @@ class Reddit_Adapter(asyncpraw.Reddit):
     
     def get_events_last_5m_10m_15m(self) -> tuple[int]:
         """Returns an tuple containing the number of requests made in the last 5, 10 and 15 minutes"""
-        return (self.__events.get_count("5m"), self.__events.get_count("10m"), self.__events.get_count("15m"))
\ No newline at end of file
+        return (self.__events.get_count("5m"), self.__events.get_count("10m"), self.__events.get_count("15m"))
+    
+    def get_total_cache_hits(self) -> int:
+        """Returns the total number of fetches answered without an request, since the creation of the adapter"""
+        return self.__cache_hits.get_total_events()
+    
+    def get_cache_hits_last_5m_10m_15m(self) -> tuple[int]:
+        """Returns an tuple containing the number of fetches answered without an request in the last 5, 10 and 15 minutes"""
+        return (self.__cache_hits.get_count("5m"), self.__cache_hits.get_count("10m"), self.__cache_hits.get_count("15m"))
\ No newline at end of file
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable
+from urllib.parse import urlparse
+from utils.datetime_tools import get_elapsed_time_milliseconds
+
+class Platform_Stats:
+    """Tracks the health and latency of the fetches made through a single platform adapter"""
+    LATENCY_SAMPLES = 100
+    UNHEALTHY_AFTER_FAILURES = 3
+
+    def __init__(self):
+        self.total_fetches = 0
+        self.failed_fetches = 0
+        self.consecutive_failures = 0
+        self.last_error:str | None = None
+        self.__latencies:deque[float] = deque(maxlen = self.LATENCY_SAMPLES)
+
+    def record(self, latency:float, error:Exception | None = None):
+        """Records the outcome of a single fetch"""
+        self.total_fetches += 1
+        self.__latencies.append(latency)
+        if error is None:
+            self.consecutive_failures = 0
+        else:
+            self.failed_fetches += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{error.__class__.__name__}: {error}"
+
+    def is_healthy(self) -> bool:
+        """Returns False, if the latest fetches failed in a row"""
+        return self.consecutive_failures < self.UNHEALTHY_AFTER_FAILURES
+
+    def get_average_latency(self) -> float:
+        """Returns the average latency (in seconds) of the latest fetches"""
+        return sum(self.__latencies) / len(self.__latencies) if self.__latencies else 0.0
+
+    def get_max_latency(self) -> float:
+        """Returns the highest latency (in seconds) of the latest fetches"""
+        return max(self.__latencies, default = 0.0)
+
+class Platform_Entry:
+    """A registered platform, its adapter is only constructed the first time it is needed"""
+
+    def __init__(self, name:str, hostnames:tuple[str, ...], factory:Callable[[], Any]):
+        self.name = name
+        self.hostnames = hostnames
+        self.stats = Platform_Stats()
+        self.__factory = factory
+        self.__adapter = None
+        self.__logger = logging.getLogger(f"app.platforms.{name}")
+
+    @property
+    def adapter(self) -> Any:
+        """The adapter of the platform, constructed on first access"""
+        if self.__adapter is None:
+            start_time = datetime.now().timestamp()
+            self.__adapter = self.__factory()
+            self.__logger.info("Created adapter for %s after %s", self.name, get_elapsed_time_milliseconds(datetime.now().timestamp() - start_time))
+        return self.__adapter
+
+    def is_constructed(self) -> bool:
+        """Returns True, if the adapter has already been constructed"""
+        return self.__adapter is not None
+
+    def get_constructed_adapter(self) -> Any | None:
+        """Returns the adapter without constructing it, None if it has not been used yet"""
+        return self.__adapter
+
+    async def fetch(self, post_url:str) -> Any:
+        """Fetches the post through the adapter, while recording the latency and outcome"""
+        adapter = self.adapter
+        start = perf_counter()
+        try:
+            post = await adapter.fetch(post_url)
+        except Exception as error:
+            self.stats.record(perf_counter() - start, error)
+            raise
+        self.stats.record(perf_counter() - start)
+        return post
+
+    async def fetch_many(self, post_urls:list[str]) -> list[Any]:
+        """Fetches multiple posts, the result for each url is either the post or the exception raised while fetching it
+
+        Adapters without a `fetch_many` of their own fetch the posts concurrently, one by one"""
+        adapter = self.adapter
+        start = perf_counter()
+        if hasattr(adapter, "fetch_many"):
+            try:
+                posts = await adapter.fetch_many(post_urls)
+            except Exception as error:
+                self.stats.record(perf_counter() - start, error)
+                raise
+        else:
+            posts = await asyncio.gather(*(adapter.fetch(post_url) for post_url in post_urls), return_exceptions = True)
+
+        errors = [post for post in posts if isinstance(post, Exception)]
+        self.stats.record(perf_counter() - start, errors[0] if errors else None)
+        return posts
+
+class Platform_Registry:
+    """Maps hostnames to the adapters of the supported platforms
+
+    Each adapter declares the hostnames it serves, subdomains (like `www.` or `old.`) are matched by their suffix.
+    Exact hostnames only match themselves, for domains whose subdomains belong to other services (like the media hosts of a platform)."""
+    VERSION = "1.0"
+
+    def __init__(self):
+        self.__platforms:dict[str, Platform_Entry] = {}
+        self.__hosts:dict[str, Platform_Entry] = {}
+        self.__exact_hosts:dict[str, Platform_Entry] = {}
+
+    def register(self, name:str, hostnames:tuple[str, ...], factory:Callable[[], Any], exact_hostnames:tuple[str, ...] = ()) -> Platform_Entry:
+        """Registers a platform, `factory` is called to construct its adapter when it is used for the first time
+
+        `hostnames` are matched including their subdomains, `exact_hostnames` without them"""
+        entry = Platform_Entry(name, hostnames + exact_hostnames, factory)
+        self.__platforms[name] = entry
+        for hostname in hostnames:
+            self.__hosts[hostname.lower()] = entry
+        for hostname in exact_hostnames:
+            self.__exact_hosts[hostname.lower()] = entry
+        return entry
+
+    def resolve(self, url:str) -> Platform_Entry | None:
+        """Returns the platform responsible for the url, or None if the host is not supported"""
+        hostname = urlparse(url).hostname
+        if not hostname:
+            return None
+        if hostname in self.__exact_hosts:
+            return self.__exact_hosts[hostname]
+
+        # Look up the host and all of its parent domains, longest first
+        while True:
+            entry = self.__hosts.get(hostname)
+            if entry is not None:
+                return entry
+            dot = hostname.find(".")
+            if dot == -1:
+                return None
+            hostname = hostname[dot + 1:]
+
+    def get(self, name:str) -> Platform_Entry:
+        """Returns the platform registered under the name"""
+        return self.__platforms[name]
+
+    def get_platforms(self) -> list[Platform_Entry]:
+        """Returns all registered platforms"""
+        return list(self.__platforms.values())
+
+    async def close(self):
+        """Closes all adapters that have been constructed"""
+        for entry in self.__platforms.values():
+            adapter = entry.get_constructed_adapter()
+            if adapter is not None and hasattr(adapter, "close"):
+                await adapter.close()
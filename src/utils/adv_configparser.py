@@ -6,7 +6,7 @@ from shutil import copy
 
 class Advanced_ConfigParser(configparser.ConfigParser):
     """Utility class to ease the use of the configparser libary"""
-    VERSION = "2.5"
+    VERSION = "2.6"
     number_of_instances = 0
 
     def __init__(self, path:str, allow_template:bool = True, allow_update:bool = True) -> None:
@@ -25,6 +25,7 @@ class Advanced_ConfigParser(configparser.ConfigParser):
         self.__instance_number = self.__class__.number_of_instances
         self.__class__.number_of_instances += 1
         self.__from_template = False
+        self.__template:configparser.ConfigParser | None = None
 
         self.__logger = logging.getLogger(f"utils.config.{self.__instance_number}")
         self.__logger.debug(f"New instance {self.__instance_number} of class created")
@@ -48,7 +49,8 @@ class Advanced_ConfigParser(configparser.ConfigParser):
         self.__pending_changes = 0
 
         try:
-            self.read_file(open(path))
+            with open(path) as config_file:
+                self.read_file(config_file)
         except:
             pass
         else:
@@ -67,6 +69,14 @@ class Advanced_ConfigParser(configparser.ConfigParser):
         path_to_temp = Path(path_to_file) / f".{file_name}.template"
 
         return path_to_temp
+
+    def __get_template(self) -> configparser.ConfigParser:
+        """Returns the parsed template, the file is only read the first time"""
+        if self.__template is None:
+            self.__template = configparser.ConfigParser()
+            with open(self.__template_path) as template_file:
+                self.__template.read_file(template_file)
+        return self.__template
     
     def __has_all_template_options(self, template:configparser.ConfigParser):
         """Check if config contains all sections and options from the template"""
@@ -113,6 +123,42 @@ class Advanced_ConfigParser(configparser.ConfigParser):
             self.write(configfile)
         self.__logger.debug(f"Contents ({self.__pending_changes} changes) have been saved to disk")
 
+    def reload(self) -> "set[tuple[str, str]]":
+        """Reads the config file again and returns the (section, option) pairs whose value changed
+
+        The values are only replaced once the file has been parsed successfully.
+        Options removed from the file fall back to the value of the template, like they would at startup."""
+        reloaded = configparser.ConfigParser()
+        with open(self.__file_path) as config_file:
+            reloaded.read_file(config_file)
+
+        if isfile(self.__template_path):
+            template_config = self.__get_template()
+            for section in template_config.sections():
+                if not reloaded.has_section(section):
+                    reloaded.add_section(section)
+                for option, value in template_config.items(section, raw = True):
+                    if not reloaded.has_option(section, option):
+                        self.__logger.warning(f"Option '{option}' in section '{section}' is missing, using the value of the template: '{value}'")
+                        reloaded.set(section, option, value)
+
+        changed_options = set()
+        for section in reloaded.sections():
+            if not self.has_section(section):
+                self.add_section(section)
+            for option, value in reloaded.items(section, raw = True):
+                if self.get(section, option, raw = True, fallback = None) != value:
+                    super().set(section, option, value)
+                    changed_options.add((section, option))
+        for section in self.sections():
+            for option in self.options(section):
+                if not reloaded.has_option(section, option):
+                    super().remove_option(section, option)
+                    changed_options.add((section, option))
+
+        self.__logger.info(f"Reloaded config file at path {self.__file_path}, {len(changed_options)} options changed")
+        return changed_options
+
     def get_config_file_path(self) -> str:
         """Returns the path to the config file"""
         return self.__file_path
@@ -141,8 +187,7 @@ class Advanced_ConfigParser(configparser.ConfigParser):
         if self.__template_path == None:
             return "not_found"
         
-        template_config = configparser.ConfigParser()
-        template_config.read_file(open(self.__template_path))
+        template_config = self.__get_template()
         config_sections = set(self.sections())
         template_sections = set(template_config.sections())
 
@@ -211,8 +256,7 @@ class Advanced_ConfigParser(configparser.ConfigParser):
         no options are deleted or their values changed."""
         if self.__template_path == None:
             raise FileNotFoundError
-        template_config = configparser.ConfigParser()
-        template_config.read_file(open(self.__template_path))
+        template_config = self.__get_template()
 
         updated_options = 0
         for section in template_config.sections():
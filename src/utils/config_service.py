@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable
+from utils.adv_configparser import Advanced_ConfigParser
+
+class Config_Service:
+    """Serves the values of an `Advanced_ConfigParser` through typed, cached accessors and reloads them when the file changes
+
+    The file is checked for changes of its modification time in a fixed interval.
+    After a reload, the registered callbacks receive the (section, option) pairs whose value changed."""
+    VERSION = "1.0"
+
+    def __init__(self, config:Advanced_ConfigParser, check_interval:float = 5):
+        """Initializes the service for the already loaded config, checking the file for changes every `check_interval` seconds"""
+        self.config = config
+        self.__check_interval = check_interval
+        self.__values:dict[tuple[str, str, str], Any] = {}
+        self.__callbacks:list[Callable[[set[tuple[str, str]]], Awaitable[None] | None]] = []
+        self.__mtime = self.__get_mtime()
+        self.__watch_task:asyncio.Task | None = None
+        self.__reloads = 0
+        self.__logger = logging.getLogger("utils.config_service")
+
+    def __get_mtime(self) -> float | None:
+        try:
+            return os.stat(self.config.get_config_file_path()).st_mtime
+        except OSError:
+            return None
+
+    def __get(self, kind:str, section:str, option:str, getter:Callable[[str, str], Any]) -> Any:
+        key = (kind, section, option)
+        try:
+            return self.__values[key]
+        except KeyError:
+            value = self.__values[key] = getter(section, option)
+            return value
+
+    def get_str(self, section:str, option:str) -> str:
+        """Returns the value of the option as string"""
+        return self.__get("str", section, option, self.config.get)
+
+    def get_int(self, section:str, option:str) -> int:
+        """Returns the value of the option as integer"""
+        return self.__get("int", section, option, self.config.getint)
+
+    def get_float(self, section:str, option:str) -> float:
+        """Returns the value of the option as float"""
+        return self.__get("float", section, option, self.config.getfloat)
+
+    def get_bool(self, section:str, option:str) -> bool:
+        """Returns the value of the option as boolean"""
+        return self.__get("bool", section, option, self.config.getboolean)
+
+    def add_reload_callback(self, callback:Callable[[set[tuple[str, str]]], Awaitable[None] | None]):
+        """Registers a callback, called with the changed (section, option) pairs after each reload"""
+        self.__callbacks.append(callback)
+
+    async def reload(self) -> set[tuple[str, str]]:
+        """Reads the file again and notifies the callbacks, if any value changed
+
+        If the file can not be parsed, the previous values are kept."""
+        # The file is small, reading it on the event loop keeps readers of the config from seeing half applied values
+        try:
+            changed_options = self.config.reload()
+        except Exception as error:
+            self.__logger.error("Could not reload '%s', keeping the previous values: %s", self.config.get_config_file_path(), error)
+            return set()
+
+        self.__values.clear()
+        self.__reloads += 1
+        if changed_options:
+            self.__logger.info("Applying changed options: %s", ", ".join(sorted(f"{section}.{option}" for section, option in changed_options)))
+            for callback in self.__callbacks:
+                try:
+                    result = callback(changed_options)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as error:
+                    self.__logger.exception("Reload callback %s failed: %s", callback, error)
+        return changed_options
+
+    async def __watch(self):
+        while True:
+            await asyncio.sleep(self.__check_interval)
+            mtime = self.__get_mtime()
+            if mtime is not None and mtime != self.__mtime:
+                self.__mtime = mtime
+                await self.reload()
+
+    def start_watching(self):
+        """Starts checking the file for changes"""
+        if self.__watch_task is None:
+            self.__watch_task = asyncio.create_task(self.__watch())
+
+    def stop_watching(self):
+        """Stops checking the file for changes"""
+        if self.__watch_task is not None:
+            self.__watch_task.cancel()
+            self.__watch_task = None
+
+    def get_reloads(self) -> int:
+        """Returns the number of times the file has been reloaded"""
+        return self.__reloads
@@ -1,43 +1,77 @@
-from datetime import datetime
+from math import ceil
+from time import time
 import re
 
 class Event_Counter:
-    """A class to track and count events, storing the event timestamps and allowing queries 
+    """A class to track and count events, storing the number of events per time slot in a ring buffer and allowing queries 
     
     for the number of events in specific time windows (e.g., last 5 minutes, 10 minutes)."""
     REGEX_PATTERN = r'(\d+)\s*(sec|second|seconds|s|min|minute|minutes|m|h|hour|hours|d|day|days)'
+    COMPILED_PATTERN = re.compile(REGEX_PATTERN, flags=re.IGNORECASE)
     TIME_MULTIPLIERS = {
         'sec': 1, 'second': 1, 'seconds': 1, 's': 1,
         'min': 60, 'minute': 60, 'minutes': 60, 'm': 60,
         'h': 3600, 'hour': 3600, 'hours': 3600,
         'd': 86400, 'day': 86400, 'days': 86400
     }
+    # Parsed durations, the same few window strings are queried over and over again
+    __duration_cache:dict[str, int] = {}
 
-    def __init__(self, retention_duration:int = 900) -> None:
+    def __init__(self, retention_duration:int = 900, resolution:int = 1, windows:tuple[str, ...] = ()) -> None:
         """
         Initializes the Event_Counter object with a specified retention duration.
 
         Args:
             retention_duration (int, optional): 
                 The time period (in seconds) for which event data should be retained. Defaults to 900 (15 minutes).
+            resolution (int, optional):
+                The length (in seconds) of a single time slot, events within the same slot are counted together. Defaults to 1.
+            windows (tuple[str, ...], optional):
+                The time windows queried regularly (e.g., "5m"), a running total is kept for each of them. Defaults to none.
         
         uwu
         """
-        self.__events:list[float] = []
         self.__total_events = 0
-        self.__retention_duration = retention_duration
+        self.__resolution = max(1, resolution)
+        self.__slot_count = max(1, ceil(retention_duration / self.__resolution))
+        self.__counts:list[int] = [0] * self.__slot_count
+        self.__slots:list[int] = [-1] * self.__slot_count
+        # Number of events within each configured window (by its number of slots), ending with the slot the totals have been advanced to
+        self.__window_totals:dict[int, int] = {self.__get_window_slots(time_window): 0 for time_window in windows}
+        self.__totals_slot = self.__current_slot()
+
+    def __current_slot(self) -> int:
+        return int(time() // self.__resolution)
+
+    def __get_window_slots(self, time_window:str) -> int:
+        return max(1, min(ceil(self.duration_to_seconds(time_window) / self.__resolution), self.__slot_count))
+
+    def __advance_totals(self, current_slot:int):
+        """Moves the running totals on to the current slot, the slots dropping out of each window are subtracted"""
+        if current_slot - self.__totals_slot >= self.__slot_count:
+            # Every slot has dropped out of every window
+            self.__window_totals = dict.fromkeys(self.__window_totals, 0)
+        else:
+            for slot in range(self.__totals_slot + 1, current_slot + 1):
+                for window_slots in self.__window_totals:
+                    index = (slot - window_slots) % self.__slot_count
+                    if self.__slots[index] == slot - window_slots:
+                        self.__window_totals[window_slots] -= self.__counts[index]
+        self.__totals_slot = max(self.__totals_slot, current_slot)
 
     def cleanup(self):
         """Cleans up events that are older than the retention duration.
         
-        Removes all events that occurred outside the defined retention window."""
-        offset_time = datetime.now().timestamp() - self.__retention_duration
-        while len(self.__events) > 0:
-            event_time = self.__events[0]
-            if event_time < offset_time:
-                self.__events.pop(0)
-            else:
-                break
+        Removes all events that occurred outside the defined retention window. Calling it is optional, 
+        outdated slots are also detected (and ignored or reused) when counting or incrementing."""
+        current_slot = self.__current_slot()
+        # The cleaned up slots must already be out of the running totals
+        self.__advance_totals(current_slot)
+        oldest_slot = current_slot - self.__slot_count + 1
+        for index, slot in enumerate(self.__slots):
+            if slot < oldest_slot:
+                self.__counts[index] = 0
+                self.__slots[index] = -1
 
     @classmethod
     def duration_to_seconds(cls, duration_str:str) -> int:
@@ -48,13 +82,16 @@ class Event_Counter:
 
         Returns:
             int: The total duration in seconds derived from the input string."""
-        matches = re.findall(cls.REGEX_PATTERN, duration_str, flags=re.IGNORECASE)
-        
+        total_seconds = cls.__duration_cache.get(duration_str)
+        if total_seconds is not None:
+            return total_seconds
+
         total_seconds = 0
-        for value, unit in matches:
+        for value, unit in cls.COMPILED_PATTERN.findall(duration_str):
             unit = unit.lower()
             total_seconds += int(value) * cls.TIME_MULTIPLIERS[unit]
         
+        cls.__duration_cache[duration_str] = total_seconds
         return total_seconds
 
     def increment(self, count:int = 1, skip_cleanup:bool = False):
@@ -62,14 +99,18 @@ class Event_Counter:
 
         Args:
             count (int, optional): The number of events to add. Defaults to 1.
-            skip_cleanup (bool, optional): If True, skips the cleanup process. Defaults to False."""
-        timestamp = datetime.now().timestamp()
+            skip_cleanup (bool, optional): Kept for compatibility, outdated slots are reused without a cleanup. Defaults to False."""
+        slot = self.__current_slot()
+        self.__advance_totals(slot)
+        index = slot % self.__slot_count
+        if self.__slots[index] != slot:
+            # The slot still holds the events of an earlier round through the ring
+            self.__slots[index] = slot
+            self.__counts[index] = 0
+        self.__counts[index] += count
         self.__total_events += count
-        self.__events.extend([timestamp] * count)
-        
-        if skip_cleanup:
-            return
-        self.cleanup()
+        for window_slots in self.__window_totals:
+            self.__window_totals[window_slots] += count
 
     def get_count(self, time_window:str = "5M") -> int:
         """Returns the number of events that occurred within a specified time window.
@@ -80,15 +121,18 @@ class Event_Counter:
 
         Returns:
             int: The count of events that occurred within the specified time window."""
-        self.cleanup()
-        
-        offset_time = datetime.now().timestamp() - self.duration_to_seconds(time_window)
+        window_slots = self.__get_window_slots(time_window)
+        current_slot = self.__current_slot()
+        if window_slots in self.__window_totals:
+            self.__advance_totals(current_slot)
+            return self.__window_totals[window_slots]
+
+        # Windows without a running total visit the slots covering them, at most all slots within the retention duration
         counter = 0
-        for event_time in self.__events:
-            if event_time > offset_time:
-                counter += 1
-            else:
-                break
+        for slot in range(current_slot - window_slots + 1, current_slot + 1):
+            index = slot % self.__slot_count
+            if self.__slots[index] == slot:
+                counter += self.__counts[index]
 
         return counter
 
@@ -1,12 +1,30 @@
+import atexit
 import logging
-from utils.logger.formatter import Colored_Formatter
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from utils.logger.formatter import Colored_Formatter, Json_Formatter, Plain_Formatter
+
+class Lazy_Queue_Handler(QueueHandler):
+    """Puts the records into the queue as they are, the message is only formatted by the listener thread
+
+    Unlike the default `QueueHandler.prepare`, nothing is formatted on the calling thread.
+    The arguments of a log call are therefore formatted a moment later, the records never leave the process."""
+    def prepare(self, record:logging.LogRecord) -> logging.LogRecord:
+        return record
 
 class Custom_Logger:
     console_handler: logging.StreamHandler
     colored_formatter: Colored_Formatter
+    queue_handler: Lazy_Queue_Handler
+    listener: QueueListener = None
+    FORMATTERS = {"colored": Colored_Formatter, "plain": Plain_Formatter, "json": Json_Formatter}
     
     @classmethod
     def initialize(cls):
+        # The attributes below are not used by any of the formatters
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
         # Create the handler for logging to the console
         cls.console_handler = logging.StreamHandler()
         cls.console_handler.setLevel(logging.DEBUG)
@@ -15,23 +33,66 @@ class Custom_Logger:
         cls.colored_formatter = Colored_Formatter()
         cls.console_handler.setFormatter(cls.colored_formatter)
 
+        # The loggers only put the records into the queue, formatting and writing happens on the thread of the listener
+        log_queue = SimpleQueue()
+        cls.queue_handler = Lazy_Queue_Handler(log_queue)
+        cls.listener = QueueListener(log_queue, cls.console_handler, respect_handler_level = True)
+        cls.listener.start()
+        atexit.register(cls.shutdown)
+
         # Create the loggers for the different sections of the app
         discordpy_logger = logging.getLogger("discord")
-        discordpy_logger.addHandler(cls.console_handler)
+        discordpy_logger.addHandler(cls.queue_handler)
         discordpy_logger.setLevel(logging.INFO)
 
         app_logger = logging.getLogger("app")
-        app_logger.addHandler(cls.console_handler)
+        app_logger.addHandler(cls.queue_handler)
         app_logger.setLevel(logging.DEBUG)
 
         utils_logger = logging.getLogger("utils")
-        utils_logger.addHandler(cls.console_handler)
+        utils_logger.addHandler(cls.queue_handler)
         utils_logger.setLevel(logging.DEBUG)
 
         commands_logger = logging.getLogger("cmds")
-        commands_logger.addHandler(cls.console_handler)
+        commands_logger.addHandler(cls.queue_handler)
         commands_logger.setLevel(logging.DEBUG)
 
+        pipeline_logger = logging.getLogger("pipeline")
+        pipeline_logger.addHandler(cls.queue_handler)
+        pipeline_logger.setLevel(logging.DEBUG)
+
+        platforms_logger = logging.getLogger("pltfm")
+        platforms_logger.addHandler(cls.queue_handler)
+        platforms_logger.setLevel(logging.DEBUG)
+
         logging.getLogger('discord.app_commands.tree').setLevel(logging.DEBUG)
 
-        app_logger.debug("Logging successfully initialized")
\ No newline at end of file
+        app_logger.debug("Logging successfully initialized")
+
+    @classmethod
+    def configure(cls, log_format:str = "colored", file_path:str = None, file_max_size:int = 10485760, file_backup_count:int = 5):
+        """Changes the format of the console output and optionally writes the logs into a rotating file
+
+        `log_format` is one of `colored`, `plain` or `json`, the file always uses the plain or json format."""
+        if log_format not in cls.FORMATTERS:
+            raise ValueError(f"Unknown log format '{log_format}', expected one of {', '.join(cls.FORMATTERS)}")
+        # Drain the queue with the old handlers, before they are changed
+        cls.listener.stop()
+        cls.console_handler.setFormatter(cls.colored_formatter if log_format == "colored" else cls.FORMATTERS[log_format]())
+        handlers = [cls.console_handler]
+
+        if file_path:
+            file_handler = RotatingFileHandler(file_path, maxBytes = file_max_size, backupCount = file_backup_count, encoding = "utf-8")
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(Json_Formatter() if log_format == "json" else Plain_Formatter())
+            handlers.append(file_handler)
+
+        cls.listener = QueueListener(cls.queue_handler.queue, *handlers, respect_handler_level = True)
+        cls.listener.start()
+        logging.getLogger("app").debug("Logging configured (format %s, file %s)", log_format, file_path or "disabled")
+
+    @classmethod
+    def shutdown(cls):
+        """Writes the remaining records and stops the thread of the listener"""
+        if cls.listener is not None and cls.listener._thread is not None:
+            cls.listener.stop()
\ No newline at end of file
@@ -1,30 +1,71 @@
-from logging import Formatter
+import json
+from datetime import datetime, timezone
+from logging import Formatter, LogRecord
 from colorama import Style, Fore
 
 class Colored_Formatter(Formatter):
+    # Farben der Log-Level, einmalig mit fester Breite vorbereitet
+    LEVEL_COLORS = {
+        'DEBUG': Fore.CYAN,
+        'INFO': Fore.BLUE,
+        'WARNING': Fore.YELLOW,
+        'ERROR': Fore.RED,
+        'CRITICAL': f"{Style.BRIGHT}{Fore.RED}"
+    }
+
     def __init__(self, fmt=None, datefmt='%Y-%m-%d %H:%M:%S', style='%'):
         super().__init__(fmt, datefmt, style)
-        
-    def format(self, record):
-        # Formatieren des Zeitstempels fett
-        date = f"{Style.BRIGHT}{Fore.BLACK}{self.formatTime(record, self.datefmt)}{Style.RESET_ALL}"
-        
-        # Färben des Log-Levels mit fester Breite
-        levelname_color = {
-            'DEBUG': Fore.CYAN,
-            'INFO': Fore.BLUE,
-            'WARNING': Fore.YELLOW,
-            'ERROR': Fore.RED,
-            'CRITICAL': f"{Style.BRIGHT}{Fore.RED}"
-        }
-        levelname = f"{levelname_color.get(record.levelname, Fore.WHITE)}{record.levelname:<8}{Fore.RESET}{Style.RESET_ALL}"
-        
+        self.__levelnames = {levelname: f"{color}{levelname:<8}{Fore.RESET}{Style.RESET_ALL}" for levelname, color in self.LEVEL_COLORS.items()}
+        self.__names:dict[str, str] = {}
+        self.__last_second = None
+        self.__last_date = ""
+
+    def format(self, record:LogRecord):
+        # Formatieren des Zeitstempels fett, nur einmal pro Sekunde
+        second = int(record.created)
+        if second != self.__last_second:
+            self.__last_second = second
+            self.__last_date = f"{Style.BRIGHT}{Fore.BLACK}{self.formatTime(record, self.datefmt)}{Style.RESET_ALL}"
+
+        levelname = self.__levelnames.get(record.levelname)
+        if levelname is None:
+            levelname = f"{Fore.WHITE}{record.levelname:<8}{Fore.RESET}{Style.RESET_ALL}"
+
         # Färben des Logger-Namens in Magenta mit fester Breite
-        name = f"{Fore.MAGENTA}{record.name:<20}{Fore.RESET}"
-        
-        # Die Nachricht bleibt unverändert
-        message = record.getMessage()
-        
-        # Zusammenfügen der gefärbten Teile
-        formatted_record = f"{date} {levelname} {name} {message}"
-        return formatted_record
\ No newline at end of file
+        name = self.__names.get(record.name)
+        if name is None:
+            name = self.__names[record.name] = f"{Fore.MAGENTA}{record.name:<20}{Fore.RESET}"
+
+        # Zusammenfügen der gefärbten Teile, Tracebacks werden angehängt
+        formatted_record = f"{self.__last_date} {levelname} {name} {record.getMessage()}"
+        return self.append_traceback(record, formatted_record)
+
+    def append_traceback(self, record:LogRecord, formatted_record:str) -> str:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            formatted_record = f"{formatted_record}\n{record.exc_text}"
+        if record.stack_info:
+            formatted_record = f"{formatted_record}\n{self.formatStack(record.stack_info)}"
+        return formatted_record
+
+class Plain_Formatter(Formatter):
+    """Same layout as the `Colored_Formatter`, without escape sequences (for log files and log collectors)"""
+    def __init__(self, datefmt='%Y-%m-%d %H:%M:%S'):
+        super().__init__("%(asctime)s %(levelname)-8s %(name)-20s %(message)s", datefmt)
+
+class Json_Formatter(Formatter):
+    """Formats each record as a single line of json"""
+    def format(self, record:LogRecord):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii = False, default = str)
\ No newline at end of file
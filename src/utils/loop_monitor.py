@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import traceback
+from collections import deque
+from time import monotonic, process_time
+
+class Loop_Monitor:
+    """Measures how late the event loop wakes up a sleeping task, and reports callbacks blocking the loop
+
+    A task on the loop sleeps for a fixed interval and records the delay it has been woken up with.
+    A watchdog thread checks the heartbeat of that task, and logs the stack of the loop thread once it has been blocked longer than the threshold."""
+    VERSION = "1.0"
+
+    def __init__(self, interval:float = 0.1, block_threshold:float = 0.25, window:int = 600):
+        """Initializes the monitor, sampling every `interval` seconds and keeping the last `window` samples
+
+        Blocks of the loop longer than `block_threshold` seconds are logged, 0 disables the watchdog"""
+        self.__interval = interval
+        self.__block_threshold = block_threshold
+        self.__samples:deque[float] = deque(maxlen = window)
+        self.__heartbeat = monotonic()
+        self.__blocked_calls = 0
+        self.__task:asyncio.Task | None = None
+        self.__watchdog:threading.Thread | None = None
+        self.__stopped = threading.Event()
+        self.__loop_thread_id:int | None = None
+        self.__logger = logging.getLogger("utils.loop_monitor")
+
+    async def __sample(self):
+        while True:
+            start = monotonic()
+            await asyncio.sleep(self.__interval)
+            self.__heartbeat = now = monotonic()
+            self.__samples.append(max(0.0, now - start - self.__interval))
+
+    def __watch(self):
+        """Runs on the watchdog thread, logs each block of the loop once while it is still blocked"""
+        reported_heartbeat = None
+        while not self.__stopped.wait(max(0.01, self.__block_threshold / 2)):
+            if not self.__block_threshold:
+                continue
+            heartbeat = self.__heartbeat
+            blocked_for = monotonic() - heartbeat - self.__interval
+            if blocked_for < self.__block_threshold or heartbeat == reported_heartbeat:
+                continue
+
+            reported_heartbeat = heartbeat
+            self.__blocked_calls += 1
+            frame = sys._current_frames().get(self.__loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "Stack not available\n"
+            self.__logger.warning("The event loop has been blocked for %.0fms, currently executing:\n%s", blocked_for * 1000, stack.rstrip())
+
+    def start(self):
+        """Starts sampling on the running loop and the watchdog thread"""
+        if self.__task is not None:
+            return
+        self.__loop_thread_id = threading.get_ident()
+        self.__heartbeat = monotonic()
+        self.__task = asyncio.create_task(self.__sample())
+        self.__stopped.clear()
+        self.__watchdog = threading.Thread(target = self.__watch, name = "loop-watchdog", daemon = True)
+        self.__watchdog.start()
+
+    def stop(self):
+        """Stops sampling and the watchdog thread"""
+        if self.__task is None:
+            return
+        self.__task.cancel()
+        self.__task = None
+        self.__stopped.set()
+        self.__watchdog.join()
+
+    def set_block_threshold(self, block_threshold:float):
+        """Changes the threshold at runtime, 0 disables the watchdog"""
+        self.__block_threshold = block_threshold
+
+    def get_lag_percentile(self, percent:float) -> float:
+        """Returns the percentile (0 - 100) of the lag (in seconds) over the recent samples"""
+        if not self.__samples:
+            return 0.0
+        ordered = sorted(self.__samples)
+        return ordered[min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))]
+
+    def get_max_lag(self) -> float:
+        """Returns the largest lag (in seconds) over the recent samples"""
+        return max(self.__samples, default = 0.0)
+
+    def get_blocked_calls(self) -> int:
+        """Returns the number of times the loop has been blocked longer than the threshold"""
+        return self.__blocked_calls
+
+    @staticmethod
+    def get_task_count() -> int:
+        """Returns the number of tasks not yet done on the running loop"""
+        return len(asyncio.all_tasks())
+
+    @staticmethod
+    def get_rss() -> int:
+        """Returns the resident set size (in bytes) of the process, 0 if not available on this platform"""
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            return 0
+
+    @staticmethod
+    def get_cpu_time() -> float:
+        """Returns the CPU time (user and system, in seconds) consumed by the process"""
+        return process_time()
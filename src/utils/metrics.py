@@ -0,0 +1,121 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable
+from utils.singleton import Singleton
+
+class Counter:
+    """A monotonically increasing value, optionally split by labels"""
+    TYPE = "counter"
+
+    def __init__(self, name:str, description:str, label_names:tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.__values:dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount:float = 1, **labels):
+        """Increases the counter (with the given label values) by the amount"""
+        key = tuple(str(labels[label_name]) for label_name in self.label_names)
+        self.__values[key] = self.__values.get(key, 0) + amount
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        return [(self.name, key, value) for key, value in self.__values.items()]
+
+class Histogram:
+    """Counts observations (like durations) in cumulative buckets, optionally split by labels"""
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name:str, description:str, label_names:tuple[str, ...] = (), buckets:tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.__buckets = tuple(sorted(buckets))
+        # Per label values: count of each bucket (non cumulative, last one is +Inf), sum of observations
+        self.__values:dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value:float, **labels):
+        """Records a single observation"""
+        key = tuple(str(labels[label_name]) for label_name in self.label_names)
+        bucket_counts, total = self.__values.setdefault(key, ([0] * (len(self.__buckets) + 1), [0.0]))
+        bucket_counts[bisect_left(self.__buckets, value)] += 1
+        total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the time (in seconds) spent inside of the `with` block"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        samples = []
+        for key, (bucket_counts, total) in self.__values.items():
+            cumulative = 0
+            for upper_bound, count in zip((*self.__buckets, "+Inf"), bucket_counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", (*key, str(upper_bound)), cumulative))
+            samples.append((f"{self.name}_sum", key, total[0]))
+            samples.append((f"{self.name}_count", key, cumulative))
+        return samples
+
+class Callback_Metric:
+    """A metric whose value is read from a callback at the time it is collected"""
+
+    def __init__(self, name:str, description:str, callback:Callable[[], float], metric_type:str = "gauge"):
+        self.name = name
+        self.description = description
+        self.label_names = ()
+        self.TYPE = metric_type
+        self.__callback = callback
+
+    def samples(self) -> list[tuple[str, tuple[str, ...], float]]:
+        return [(self.name, (), self.__callback())]
+
+@Singleton
+class Metrics_Registry:
+    """Holds all metrics of the process and renders them in the prometheus text format
+
+    Access the registry with `Metrics_Registry.instance()`, metrics are created on first request and shared afterwards."""
+    VERSION = "1.0"
+
+    def __init__(self):
+        self.__metrics:dict[str, Counter | Histogram | Callback_Metric] = {}
+
+    def counter(self, name:str, description:str, label_names:tuple[str, ...] = ()) -> Counter:
+        """Returns the counter with the given name, creating it if necessary"""
+        return self.__metrics.setdefault(name, Counter(name, description, label_names))
+
+    def histogram(self, name:str, description:str, label_names:tuple[str, ...] = (), buckets:tuple[float, ...] = Histogram.DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram with the given name, creating it if necessary"""
+        return self.__metrics.setdefault(name, Histogram(name, description, label_names, buckets))
+
+    def callback(self, name:str, description:str, callback:Callable[[], float], metric_type:str = "gauge") -> Callback_Metric:
+        """Registers (or replaces) a metric, whose value is read from the callback when collected"""
+        self.__metrics[name] = Callback_Metric(name, description, callback, metric_type)
+        return self.__metrics[name]
+
+    def render(self) -> str:
+        """Returns all metrics in the prometheus text exposition format"""
+        lines = []
+        for metric in self.__metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for sample_name, label_values, value in metric.samples():
+                label_names = metric.label_names
+                if sample_name.endswith("_bucket"):
+                    label_names = (*label_names, "le")
+                if label_names:
+                    labels = ",".join(f'{label_name}="{label_value}"' for label_name, label_value in zip(label_names, label_values))
+                    lines.append(f"{sample_name}{{{labels}}} {value}")
+                else:
+                    lines.append(f"{sample_name} {value}")
+        return "\n".join(lines) + "\n"
+
+# Metrics shared between the stages of the pipeline
+POST_STAGE_SECONDS = Metrics_Registry.instance().histogram("postit_post_stage_seconds", "Time spent in each stage of the post command", ("stage",))
+MEDIA_BYTES_IN = Metrics_Registry.instance().counter("postit_media_bytes_in_total", "Bytes of media downloaded from the platforms")
+MEDIA_BYTES_OUT = Metrics_Registry.instance().counter("postit_media_bytes_out_total", "Bytes of converted media uploaded to discord")
@@ -0,0 +1,34 @@
+import logging
+from aiohttp import web
+from utils.metrics import Metrics_Registry
+
+class Metrics_Exporter:
+    """Serves the metrics of the `Metrics_Registry` over http, to be scraped by prometheus
+
+    The server runs on the event loop of the bot, no additional thread or process is required."""
+    VERSION = "1.0"
+
+    def __init__(self, host:str = "127.0.0.1", port:int = 9464):
+        """Initializes the exporter, listening on the given host and port once started"""
+        self.__host = host
+        self.__port = port
+        self.__runner:web.AppRunner | None = None
+        self.__logger = logging.getLogger("utils.metrics")
+
+    async def __handle_metrics(self, request:web.Request) -> web.Response:
+        return web.Response(text = Metrics_Registry.instance().render(), content_type = "text/plain", charset = "utf-8")
+
+    async def start(self):
+        """Starts listening for requests at `/metrics`"""
+        app = web.Application()
+        app.router.add_get("/metrics", self.__handle_metrics)
+        self.__runner = web.AppRunner(app, access_log = None)
+        await self.__runner.setup()
+        await web.TCPSite(self.__runner, self.__host, self.__port).start()
+        self.__logger.info(f"Serving metrics at http://{self.__host}:{self.__port}/metrics")
+
+    async def stop(self):
+        """Stops the server"""
+        if self.__runner is not None:
+            await self.__runner.cleanup()
+            self.__runner = None
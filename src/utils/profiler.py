@@ -0,0 +1,123 @@
+import asyncio
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from time import monotonic, sleep
+
+class Sampling_Profiler:
+    """Samples the stacks of all threads of the live process in a fixed interval, without instrumenting any code
+
+    Functions are counted once per sample they are on the stack of (cumulative), and once more if they are on top of it (self)."""
+    VERSION = "1.0"
+    KIND = "cpu"
+
+    def __init__(self, interval:float = 0.005):
+        """Initializes the profiler, taking a sample every `interval` seconds"""
+        self.__interval = interval
+        self.__samples = 0
+        self.__self_counts:Counter[tuple[str, int, str]] = Counter()
+        self.__cumulative_counts:Counter[tuple[str, int, str]] = Counter()
+        self.__thread_counts:Counter[str] = Counter()
+        self.__duration = 0.0
+
+    def __sample(self, own_thread_id:int, thread_names:dict[int, str]):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            self.__thread_counts[thread_names.get(thread_id, str(thread_id))] += 1
+            self.__self_counts[self.__get_key(frame)] += 1
+            # A recursive function is only counted once per sample
+            on_stack = set()
+            while frame is not None:
+                on_stack.add(self.__get_key(frame))
+                frame = frame.f_back
+            self.__cumulative_counts.update(on_stack)
+
+    @staticmethod
+    def __get_key(frame) -> tuple[str, int, str]:
+        code = frame.f_code
+        return (code.co_filename, code.co_firstlineno, code.co_name)
+
+    def __run(self, duration:float):
+        own_thread_id = threading.get_ident()
+        start = monotonic()
+        while monotonic() - start < duration:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.__sample(own_thread_id, thread_names)
+            self.__samples += 1
+            sleep(self.__interval)
+        self.__duration = monotonic() - start
+
+    async def run(self, duration:float):
+        """Samples the process for `duration` seconds, on a thread of its own"""
+        await asyncio.to_thread(self.__run, duration)
+
+    def format_report(self, top:int) -> str:
+        """Returns the `top` functions by self and cumulative samples, as plain text"""
+        lines = [f"Sampling profile of {self.__samples} samples over {self.__duration:.1f}s (every {self.__interval * 1000:.0f}ms)", "", "Samples per thread:"]
+        lines += [f"  {count:>8}  {thread_name}" for thread_name, count in self.__thread_counts.most_common()]
+        for title, counts in (("self", self.__self_counts), ("cumulative", self.__cumulative_counts)):
+            total = sum(self.__thread_counts.values()) or 1
+            lines += ["", f"Top {top} functions by {title} samples:", f"  {'samples':>8}  {'share':>6}  function"]
+            lines += [f"  {count:>8}  {count / total:>6.1%}  {function_name} ({filename}:{lineno})" for (filename, lineno, function_name), count in counts.most_common(top)]
+        return "\n".join(lines)
+
+class Allocation_Tracer:
+    """Traces the memory allocations of the live process with `tracemalloc` for a while, then takes a snapshot of them
+
+    Tracing slows down allocations noticeably, it is only enabled for the duration of the trace (unless it has been enabled before)."""
+    VERSION = "1.0"
+    KIND = "memory"
+
+    def __init__(self, frames:int = 10):
+        """Initializes the tracer, storing up to `frames` frames of the stack of each allocation"""
+        self.__frames = frames
+        self.__snapshot:tracemalloc.Snapshot | None = None
+        self.__traced_memory = (0, 0)
+        self.__duration = 0.0
+
+    async def run(self, duration:float):
+        """Traces the allocations for `duration` seconds and takes the snapshot"""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.__frames)
+        start = monotonic()
+        try:
+            await asyncio.sleep(duration)
+            self.__snapshot = await asyncio.to_thread(self.__take_snapshot)
+            self.__traced_memory = tracemalloc.get_traced_memory()
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        self.__duration = monotonic() - start
+
+    @staticmethod
+    def __take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>")
+        ))
+
+    def save_snapshot(self, path:Path):
+        """Writes the raw snapshot to the file, it can be loaded again with `tracemalloc.Snapshot.load`"""
+        self.__snapshot.dump(str(path))
+
+    def format_report(self, top:int) -> str:
+        """Returns the `top` allocation sites by size, as plain text"""
+        current, peak = self.__traced_memory
+        lines = [f"Allocations traced over {self.__duration:.1f}s, {current / 1048576:.1f}MB currently traced (peak {peak / 1048576:.1f}MB)"]
+        lines += ["", f"Top {top} allocation sites by size:", f"  {'size':>10}  {'blocks':>8}  location"]
+        for statistic in self.__snapshot.statistics("lineno")[:top]:
+            frame = statistic.traceback[0]
+            lines.append(f"  {statistic.size / 1024:>8.1f}KB  {statistic.count:>8}  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
+
+def save_report(directory:Path, kind:str, report:str) -> Path:
+    """Writes the report into the directory, named after the current time and the kind of profile, and returns its path"""
+    directory.mkdir(parents = True, exist_ok = True)
+    path = directory / f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{kind}.txt"
+    path.write_text(report, encoding = "utf-8")
+    return path
@@ -0,0 +1,66 @@
+import asyncio
+import discord
+import logging
+from time import monotonic
+
+class Progress_Reporter:
+    """Reports the progress of a long running command, by editing the original response of an interaction
+
+    Updates are coalesced, at most one edit is sent per `min_interval` seconds and edits that would not change the text are skipped."""
+    VERSION = "1.0"
+
+    def __init__(self, interaction:discord.Interaction, min_interval:float = 1.5):
+        """Initializes the reporter for the interaction, with the minimal interval (in seconds) between two edits"""
+        self.__interaction = interaction
+        self.__min_interval = min_interval
+        self.__latest_content:str | None = None
+        self.__sent_content:str | None = None
+        self.__last_edit = 0.0
+        self.__flush_task:asyncio.Task | None = None
+        self.__cancelled = False
+        self.__logger = logging.getLogger("utils.progress")
+
+    async def defer(self, ephemeral:bool = True):
+        """Acknowledges the interaction right away, to not run into the deadline of discord while the command is working"""
+        if not self.__interaction.response.is_done():
+            await self.__interaction.response.defer(ephemeral = ephemeral, thinking = True)
+
+    def update(self, content:str):
+        """Sets the text to be shown, it is sent as soon as the interval since the last edit has passed
+
+        Ignored once the reporter has been cancelled"""
+        if self.__cancelled:
+            return
+        self.__latest_content = content
+        if self.__flush_task is None or self.__flush_task.done():
+            self.__flush_task = asyncio.create_task(self.__flush_when_due())
+
+    async def __flush_when_due(self):
+        # Updates arriving while an edit is in progress are picked up by the next iteration
+        while self.__latest_content != self.__sent_content:
+            delay = self.__last_edit + self.__min_interval - monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.flush()
+
+    async def flush(self):
+        """Sends the latest text immediately, if it differs from the one already shown"""
+        content = self.__latest_content
+        if self.__cancelled or content is None or content == self.__sent_content:
+            return
+
+        self.__last_edit = monotonic()
+        self.__sent_content = content
+        try:
+            await self.__interaction.edit_original_response(content = content)
+        except discord.HTTPException as error:
+            self.__logger.warning("Could not update the progress of interaction %s: %s", self.__interaction.id, error)
+
+    def cancel(self):
+        """Stops sending further edits for good, should be called before the original response gets deleted
+
+        Later calls to `update` are ignored, as the response they would edit may no longer exist"""
+        self.__cancelled = True
+        self.__latest_content = self.__sent_content
+        if self.__flush_task is not None:
+            self.__flush_task.cancel()
@@ -0,0 +1,45 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from discord import app_commands
+
+class Tree_Fingerprint:
+    """Remembers a hash of the command tree last synced with discord, to skip syncing an unchanged tree"""
+    VERSION = "1.0"
+
+    def __init__(self, path:Path):
+        """Initializes the fingerprint stored at the path, the file is created on the first sync"""
+        self.__path = Path(path)
+        self.__logger = logging.getLogger("utils.tree_fingerprint")
+        self.__stored = {}
+        try:
+            self.__stored = json.loads(self.__path.read_text(encoding = "utf-8"))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as error:
+            self.__logger.warning("Could not read the stored fingerprint at '%s': %s", self.__path, error)
+
+    @staticmethod
+    def compute(tree:app_commands.CommandTree, application_id:int | None) -> str:
+        """Returns a stable hash of the global commands in the tree, as they would be sent to discord"""
+        payload = sorted((command.to_dict(tree) for command in tree.get_commands()), key = lambda command: command["name"])
+        serialized = json.dumps({"application_id": application_id, "commands": payload}, sort_keys = True, separators = (",", ":"), default = str)
+        return hashlib.sha256(serialized.encode()).hexdigest()
+
+    def matches(self, fingerprint:str) -> bool:
+        """Returns True, if the fingerprint equals the one stored after the last sync"""
+        return self.__stored.get("fingerprint") == fingerprint
+
+    def get_last_sync_duration(self) -> float:
+        """Returns the duration (in seconds) of the last sync, 0 if unknown"""
+        return self.__stored.get("sync_duration", 0.0)
+
+    def store(self, fingerprint:str, sync_duration:float):
+        """Stores the fingerprint of a tree that has just been synced"""
+        self.__stored = {"fingerprint": fingerprint, "sync_duration": sync_duration}
+        try:
+            self.__path.parent.mkdir(parents = True, exist_ok = True)
+            self.__path.write_text(json.dumps(self.__stored), encoding = "utf-8")
+        except OSError as error:
+            self.__logger.warning("Could not store the fingerprint at '%s': %s", self.__path, error)
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable
+
+class TTL_Cache:
+    """A size bounded in-memory cache, whose entries expire after a fixed time to live
+
+    When the cache is full, the least recently used entry is dropped to make room for the new one."""
+
+    def __init__(self, time_to_live:float = 300, max_size:int = 512) -> None:
+        """
+        Initializes the cache.
+
+        Args:
+            time_to_live (float, optional): Number of seconds an entry stays valid. Defaults to 300 (5 minutes).
+            max_size (int, optional): Maximum number of entries held at once. Defaults to 512.
+        """
+        self.__entries:OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__time_to_live = time_to_live
+        self.__max_size = max(1, max_size)
+
+    def get(self, key:Hashable) -> Any | None:
+        """Returns the value stored under the key, or None if there is no (valid) entry"""
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < monotonic():
+            del self.__entries[key]
+            return None
+
+        self.__entries.move_to_end(key)
+        return value
+
+    def set(self, key:Hashable, value:Any):
+        """Stores the value under the key, replacing an existing entry"""
+        self.__entries[key] = (monotonic() + self.__time_to_live, value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last = False)
+
+    def clear(self):
+        """Removes all entries"""
+        self.__entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
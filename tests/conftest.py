@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The modules of the bot import each other relative to src, like they do when the bot is started
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
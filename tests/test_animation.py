@@ -0,0 +1,31 @@
+import random
+from io import BytesIO
+import pytest
+from PIL import Image
+from pipeline.animation import read_frame_durations
+from pipeline.transcoder import fit_webp_to_budget, transcode_to_webp
+
+DURATIONS = [40, 60, 40, 80, 40, 40]
+
+def make_animation(image_format:str) -> bytes:
+    """Returns an animation of noise, which does not compress well and therefore has to be fitted"""
+    generator = random.Random(0)
+    frames = [Image.frombytes("RGB", (160, 160), generator.randbytes(160 * 160 * 3)) for _ in DURATIONS]
+    buffer = BytesIO()
+    frames[0].save(buffer, format = image_format, save_all = True, append_images = frames[1:], duration = DURATIONS, loop = 0)
+    return buffer.getvalue()
+
+def get_durations(image_data:bytes) -> list[int]:
+    with Image.open(BytesIO(image_data)) as image:
+        return read_frame_durations(image)
+
+@pytest.mark.parametrize("image_format", ["GIF", "WEBP"])
+def test_durations_survive_transcode(image_format:str):
+    assert get_durations(transcode_to_webp(make_animation(image_format), 90, 4096)) == DURATIONS
+
+@pytest.mark.parametrize("image_format", ["GIF", "WEBP"])
+def test_durations_survive_fit(image_format:str):
+    webp_data = transcode_to_webp(make_animation(image_format), 90, 4096)
+    fitted_data = fit_webp_to_budget(webp_data, 90, len(webp_data) // 3, 40, 6)
+    assert len(fitted_data) < len(webp_data)
+    assert get_durations(fitted_data) == DURATIONS
@@ -0,0 +1,27 @@
+import asyncio
+import sqlite3
+from pipeline.attachment_index import Attachment_Index, Uploaded_Attachment
+
+def test_entries_are_keyed_by_encoder_settings(tmp_path):
+    async def run():
+        index = Attachment_Index(tmp_path / "attachments.sqlite")
+        try:
+            await index.put("abc", ["image_0", "image_1"], 80, "max_edge=4096", 1, 2, [3, 4])
+            assert await index.get("abc", ["image_0", "image_1"], 80, "max_edge=4096") == [Uploaded_Attachment(1, 2, 3), Uploaded_Attachment(1, 2, 4)]
+            assert await index.get("abc", ["image_0", "image_1"], 80, "max_edge=2048") is None
+        finally:
+            index.close()
+    asyncio.run(run())
+
+def test_entries_without_encoder_settings_are_dropped(tmp_path):
+    database_path = tmp_path / "attachments.sqlite"
+    with sqlite3.connect(database_path) as connection:
+        connection.execute("CREATE TABLE attachments (submission_id TEXT NOT NULL, image_url TEXT NOT NULL, quality INTEGER NOT NULL, channel_id INTEGER NOT NULL, message_id INTEGER NOT NULL, attachment_id INTEGER NOT NULL, PRIMARY KEY (submission_id, image_url, quality))")
+        connection.execute("INSERT INTO attachments VALUES ('abc', 'image_0', 80, 1, 2, 3)")
+    connection.close()
+
+    index = Attachment_Index(database_path)
+    try:
+        assert index.get_entry_count() == 0
+    finally:
+        index.close()
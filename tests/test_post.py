@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+from pipeline.media_buffer import Memory_Budget
+from cogs.post import Post_Command
+
+class Fake_Cache:
+    """Serves every image from the cache, while counting the images read but not yet taken over by the buffers"""
+    def __init__(self, image_size:int):
+        self.image_size = image_size
+        self.outstanding = 0
+        self.max_outstanding = 0
+
+    def make_key(self, image_url:str, quality:int, encoder_settings:str) -> str:
+        return image_url
+
+    async def get(self, key:str) -> bytes:
+        await asyncio.sleep(0)
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        return bytes(self.image_size)
+
+def test_cache_hits_are_spilled_one_by_one():
+    async def run():
+        cache = Fake_Cache(1024)
+        budget = Memory_Budget(2048)
+        buffers = budget.track()
+        store = buffers.store
+        async def counting_store(data:bytes):
+            cache.outstanding -= 1
+            return await store(data)
+        buffers.store = counting_store
+
+        async def download_all(image_urls:list[str], callback):
+            assert not image_urls
+
+        client = SimpleNamespace(
+            transcode_cache = cache,
+            transcode_engine = SimpleNamespace(get_encoder_settings = lambda: ""),
+            media_downloader = SimpleNamespace(download_all = download_all)
+        )
+        cog = Post_Command(client)
+        webp_images = await cog._Post_Command__convert_images(SimpleNamespace(client = client), buffers, [f"image_{index}" for index in range(20)], 80, lambda loaded_images: None)
+        try:
+            assert len(webp_images) == 20
+            assert cache.max_outstanding == 1
+            # Only the images within the spill threshold are held in memory, the others are written to disk
+            assert budget.get_peak_bytes_in_flight() <= 2048
+            assert budget.get_spilled_images() == 18
+        finally:
+            buffers.close()
+    asyncio.run(run())